@@ -0,0 +1,11 @@
+#!/usr/bin/env python3
+""" Models package: selects the storage engine from `STORAGE_TYPE`
+"""
+from os import getenv
+
+if getenv('STORAGE_TYPE') == 'db':
+    from models.engine.db_storage import DBStorage
+    storage = DBStorage(getenv('DB_PATH', '.db.sqlite3'))
+else:
+    from models.engine.file_storage import FileStorage
+    storage = FileStorage()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+""" Database storage module
+"""
+from datetime import datetime
+from typing import List, Optional, TypeVar
+from os import path
+from models.engine.storage import Storage
+import json
+import sqlite3
+import threading
+
+
+class DBStorage(Storage):
+    """ Objects stored in a SQLite database, one table per class
+
+    Columns are the `_fields()` of the class, `id` is the primary key and
+    every attribute listed in `_indexes` gets a SQL index. Each write is its
+    own transaction. A table found empty on load is filled from the
+    `.db_<Class>.json` file of the class, if any.
+    """
+
+    def __init__(self, db_path: str):
+        """ Initialize a DBStorage on the database file `db_path`
+        """
+        self.db_path = db_path
+        self.local = threading.local()
+        self.tables = set()
+
+    def connection(self) -> sqlite3.Connection:
+        """ Return the connection of the current thread
+        """
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    def table(self, cls: type) -> str:
+        """ Create the table of `cls` if needed, return its quoted name
+        """
+        table = '"{}"'.format(cls.__name__)
+        if cls.__name__ in self.tables:
+            return table
+        columns = ['"id" TEXT PRIMARY KEY']
+        columns.extend('"{}"'.format(field) for field in cls._fields()
+                       if field != 'id')
+        conn = self.connection()
+        with conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS {} ({})".format(
+                table, ", ".join(columns)))
+            for attr in cls._indexes:
+                conn.execute(
+                    'CREATE INDEX IF NOT EXISTS "{}_{}" ON {} ("{}")'.format(
+                        cls.__name__, attr, table, attr))
+        self.tables.add(cls.__name__)
+        return table
+
+    def columns(self, cls: type, attributes) -> List[str]:
+        """ Check that `attributes` are fields of `cls`
+        """
+        fields = cls._fields()
+        for attr in attributes:
+            if attr not in fields:
+                raise AttributeError("'{}' object has no attribute '{}'"
+                                     .format(cls.__name__, attr))
+        return list(attributes)
+
+    def load(self, cls: type):
+        """ Create the table, importing the JSON file into an empty one
+        """
+        table = self.table(cls)
+        conn = self.connection()
+        if conn.execute("SELECT 1 FROM {} LIMIT 1".format(table)).fetchone():
+            return
+        file_path = ".db_{}.json".format(cls.__name__)
+        if not path.exists(file_path):
+            return
+        with open(file_path, 'r') as f:
+            objs_json = json.load(f)
+        with conn:
+            for obj_json in objs_json.values():
+                self.insert(conn, table, cls(**obj_json))
+
+    def insert(self, conn: sqlite3.Connection, table: str,
+               obj: TypeVar('Base')):
+        """ Insert or replace the row of `obj`
+        """
+        row = obj.to_json(True)
+        columns = self.columns(obj.__class__, row.keys())
+        conn.execute("INSERT OR REPLACE INTO {} ({}) VALUES ({})".format(
+            table, ", ".join('"{}"'.format(c) for c in columns),
+            ", ".join('?' for _ in columns)), [row[c] for c in columns])
+
+    def save_all(self, cls: type):
+        """ Nothing to do: every write is already committed
+        """
+        self.table(cls)
+
+    def save(self, obj: TypeVar('Base')):
+        """ Insert or update `obj` in one transaction
+        """
+        table = self.table(obj.__class__)
+        conn = self.connection()
+        with conn:
+            self.insert(conn, table, obj)
+
+    def remove(self, obj: TypeVar('Base')):
+        """ Delete `obj` in one transaction
+        """
+        table = self.table(obj.__class__)
+        conn = self.connection()
+        with conn:
+            conn.execute('DELETE FROM {} WHERE "id" = ?'.format(table),
+                         (obj.id,))
+
+    def count(self, cls: type) -> int:
+        """ Count all rows of `cls`
+        """
+        table = self.table(cls)
+        row = self.connection().execute(
+            "SELECT COUNT(*) FROM {}".format(table)).fetchone()
+        return row[0]
+
+    def get(self, cls: type, id: str) -> Optional[TypeVar('Base')]:
+        """ Return one object by ID
+        """
+        table = self.table(cls)
+        row = self.connection().execute(
+            'SELECT * FROM {} WHERE "id" = ?'.format(table), (id,)).fetchone()
+        if row is None:
+            return None
+        return cls(**dict(row))
+
+    def search(self, cls: type,
+               attributes: dict = {}) -> List[TypeVar('Base')]:
+        """ Search all rows with matching attributes
+        """
+        table = self.table(cls)
+        columns = self.columns(cls, attributes.keys())
+        query = "SELECT * FROM {}".format(table)
+        if columns:
+            query += " WHERE " + " AND ".join(
+                '"{}" IS ?'.format(c) for c in columns)
+        values = [attributes[c] for c in columns]
+        values = [v.isoformat(timespec='seconds') if type(v) is datetime
+                  else v for v in values]
+        rows = self.connection().execute(query, values)
+        return [cls(**dict(row)) for row in rows]
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+""" File storage module
+"""
+from typing import List, Optional, TypeVar
+from os import path
+from models.engine.storage import Storage
+import json
+
+
+DATA = {}
+
+
+class FileStorage(Storage):
+    """ Objects kept in memory in `DATA`, persisted to `.db_<Class>.json`
+
+    Every mutation rewrites the file of the class.
+    """
+
+    def objects(self, cls: type) -> dict:
+        """ Return the `id -> object` dictionary of `cls`
+        """
+        return DATA.setdefault(cls.__name__, {})
+
+    def load(self, cls: type):
+        """ Load all objects from file
+        """
+        s_class = cls.__name__
+        file_path = ".db_{}.json".format(s_class)
+        DATA[s_class] = {}
+        if not path.exists(file_path):
+            return
+
+        with open(file_path, 'r') as f:
+            objs_json = json.load(f)
+            for obj_id, obj_json in objs_json.items():
+                DATA[s_class][obj_id] = cls(**obj_json)
+
+    def save_all(self, cls: type):
+        """ Save all objects to file
+        """
+        file_path = ".db_{}.json".format(cls.__name__)
+        objs_json = {}
+        for obj_id, obj in self.objects(cls).items():
+            objs_json[obj_id] = obj.to_json(True)
+
+        with open(file_path, 'w') as f:
+            json.dump(objs_json, f)
+
+    def save(self, obj: TypeVar('Base')):
+        """ Save current object
+        """
+        self.objects(obj.__class__)[obj.id] = obj
+        self.save_all(obj.__class__)
+
+    def remove(self, obj: TypeVar('Base')):
+        """ Remove object
+        """
+        objs = self.objects(obj.__class__)
+        if objs.get(obj.id) is not None:
+            del objs[obj.id]
+            self.save_all(obj.__class__)
+
+    def count(self, cls: type) -> int:
+        """ Count all objects
+        """
+        return len(self.objects(cls))
+
+    def get(self, cls: type, id: str) -> Optional[TypeVar('Base')]:
+        """ Return one object by ID
+        """
+        return self.objects(cls).get(id)
+
+    def search(self, cls: type,
+               attributes: dict = {}) -> List[TypeVar('Base')]:
+        """ Search all objects with matching attributes
+        """
+        def _search(obj):
+            if len(attributes) == 0:
+                return True
+            for k, v in attributes.items():
+                if (getattr(obj, k) != v):
+                    return False
+            return True
+
+        return list(filter(_search, self.objects(cls).values()))
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+""" Storage module
+"""
+from typing import List, Optional, TypeVar
+
+
+class Storage():
+    """ Interface of the storage engines behind `Base`
+
+    Every method receives the model class it operates on, so one engine
+    serves all the models.
+    """
+
+    def load(self, cls: type):
+        """ Load (or reload) the objects of `cls` from persistent storage
+        """
+        raise NotImplementedError
+
+    def save_all(self, cls: type):
+        """ Write every object of `cls` to persistent storage
+        """
+        raise NotImplementedError
+
+    def save(self, obj: TypeVar('Base')):
+        """ Insert or update `obj`
+        """
+        raise NotImplementedError
+
+    def remove(self, obj: TypeVar('Base')):
+        """ Delete `obj` if it is stored
+        """
+        raise NotImplementedError
+
+    def count(self, cls: type) -> int:
+        """ Count the objects of `cls`
+        """
+        raise NotImplementedError
+
+    def get(self, cls: type, id: str) -> Optional[TypeVar('Base')]:
+        """ Return the object of `cls` with this ID, or None
+        """
+        raise NotImplementedError
+
+    def search(self, cls: type,
+               attributes: dict = {}) -> List[TypeVar('Base')]:
+        """ Return the objects of `cls` whose attributes equal `attributes`
+        """
+        raise NotImplementedError
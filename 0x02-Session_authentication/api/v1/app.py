@@ -4,6 +4,7 @@ Route module for the API
 """
 # Import necessary modules
 from os import getenv
+from api.v1.auth.context import auth_context
 from api.v1.views import app_views
 from flask import Flask, jsonify, abort, request
 from flask_cors import (CORS, cross_origin)
@@ -15,6 +16,13 @@ app.register_blueprint(app_views)
 CORS(app, resources={r"/api/v1/*": {"origins": "*"}})
 
 auth = None
+SERVER_TIMING = getenv("AUTH_SERVER_TIMING", "0") == "1"
+EXCLUDED_PATHS = [
+    '/api/v1/status/',
+    '/api/v1/unauthorized/',
+    '/api/v1/forbidden/',
+    '/api/v1/auth_session/login/'
+]
 
 
 # Check the value of AUTH_TYPE and initialize auth variable
@@ -31,6 +39,9 @@ elif getenv("AUTH_TYPE") == 'session_auth':
 elif getenv("AUTH_TYPE") == 'session_exp_auth':
     from api.v1.auth.session_exp_auth import SessionExpAuth
     auth = SessionExpAuth()
+elif getenv("AUTH_TYPE") == 'session_token_auth':
+    from api.v1.auth.session_token_auth import SessionTokenAuth
+    auth = SessionTokenAuth()
 elif getenv("AUTH_TYPE") == 'session_db_auth':
     from api.v1.auth.session_db_auth import SessionDBAuth
     auth = SessionDBAuth()
@@ -43,22 +54,39 @@ else:
 def request_filter() -> None:
     """ Checks if request needs authorization
     """
-    excluded_paths = [
-        '/api/v1/status/',
-        '/api/v1/unauthorized/',
-        '/api/v1/forbidden/',
-        '/api/v1/auth_session/login/'
-    ]
+    context = auth_context()
+    request.current_user = None
+    # Views marked with @auth_exempt skip the checks
+    view = app.view_functions.get(request.endpoint)
+    if getattr(view, 'auth_exempt', False):
+        return
     # Check if authentication is required for the requested path
-    if auth and auth.require_auth(request.path, excluded_paths):
+    with context.stage('require_auth'):
+        required = auth and auth.require_auth(request.path, EXCLUDED_PATHS)
+    if required:
         # Check if authorization header is present
-        if auth.authorization_header(
-                request) is None and auth.session_cookie(request) is None:
+        with context.stage('credentials'):
+            missing = auth.authorization_header(request) is None and \
+                auth.session_cookie(request) is None
+        if missing:
             abort(401)
-        # Check if current user is authorized
-        if auth.current_user(request) is None:
+        # Resolve the current user, once per request
+        with context.stage('current_user'):
+            context.user = auth.current_user(request)
+        if context.user is None:
             abort(403)
-        request.current_user = auth.current_user(request)
+        request.current_user = context.user
+
+
+@app.after_request
+def server_timing(response):
+    """ Report the auth stages in a Server-Timing header if enabled
+    """
+    if SERVER_TIMING:
+        timings = auth_context().server_timing()
+        if timings:
+            response.headers['Server-Timing'] = timings
+    return response
 
 
 # Define an error handler for 404 Not Found errors
@@ -98,4 +126,4 @@ if __name__ == "__main__":
     port = getenv("API_PORT", "5000")
 
     # Start the Flask application
-    app.run(host=host, port=port)
+    app.run(host=host, port=port, threaded=True)
@@ -4,9 +4,47 @@ Module for authentication
 """
 
 
-from typing import List, TypeVar
+from functools import lru_cache
+from typing import Callable, List, Pattern, Tuple, TypeVar
 from flask import request
 import os
+import re
+
+
+@lru_cache(maxsize=64)
+def excluded_matcher(excluded_paths: Tuple[str, ...]) -> Pattern:
+    """ Compile excluded paths into one regex matching the paths that
+    don't require authentication:
+
+    - a path starting with an excluded path;
+    - a path starting with an excluded path ending by `*`, without the `*`;
+    - a path that an excluded path starts with (nested optional groups,
+      anchored at the end).
+    """
+    alternatives = []
+    for excluded_path in excluded_paths:
+        alternatives.append(re.escape(excluded_path))
+        if excluded_path.endswith('*'):
+            alternatives.append(re.escape(excluded_path[:-1]))
+        prefixes = ""
+        for char in reversed(excluded_path):
+            prefixes = "(?:{}{})?".format(re.escape(char), prefixes)
+        alternatives.append(prefixes + r"\Z")
+    return re.compile("|".join(alternatives))
+
+
+@lru_cache(maxsize=1024)
+def path_requires_auth(path: str, excluded_paths: Tuple[str, ...]) -> bool:
+    """ Decide (and remember) whether `path` requires authentication
+    """
+    return excluded_matcher(excluded_paths).match(path) is None
+
+
+def auth_exempt(view: Callable) -> Callable:
+    """ Mark a view as public: `request_filter` skips it before any check
+    """
+    view.auth_exempt = True
+    return view
 
 
 class Auth:
@@ -26,22 +64,10 @@ class Auth:
         if path is None:
             return True
 
-        if excluded_paths is None or excluded_paths == []:
+        if not excluded_paths:
             return True
 
-        if path in excluded_paths:
-            return False
-
-        for excluded_path in excluded_paths:
-            if excluded_path.startswith(path):
-                return False
-            elif path.startswith(excluded_path):
-                return False
-            elif excluded_path[-1] == "*":
-                if path.startswith(excluded_path[:-1]):
-                    return False
-
-        return True
+        return path_requires_auth(path, tuple(excluded_paths))
 
     def authorization_header(self, request=None) -> str:
         """_summary_
@@ -3,14 +3,37 @@
 Module for authentication using Basic auth
 """
 
+from collections import OrderedDict
 from typing import Optional, Tuple, TypeVar
 from api.v1.auth.auth import Auth
+from os import getenv
 import base64
+import hashlib
+import hmac
+import os
+import threading
+import time
 from models.user import User
 
 
+CACHE_SIZE = int(getenv('BASIC_AUTH_CACHE_SIZE', 1024))
+CACHE_TTL = float(getenv('BASIC_AUTH_CACHE_TTL', 60))
+# per-process key: the cache never holds anything credentials can be
+# recovered from
+CACHE_KEY = os.urandom(32)
+
+
 class BasicAuth(Auth):
-    """Basic Authentication class"""
+    """Basic Authentication class
+
+    Verified Authorization headers are cached (`BASIC_AUTH_CACHE_SIZE`
+    entries for `BASIC_AUTH_CACHE_TTL` seconds), keyed by their HMAC, with
+    the id and password hash of their user: a hit only checks the user
+    still exists with the same password hash.
+    """
+
+    verified = OrderedDict()
+    verified_lock = threading.Lock()
 
     def extract_base64_authorization_header(
             self, authorization_header: Optional[str]) -> Optional[str]:
@@ -119,13 +142,62 @@ class BasicAuth(Auth):
         """
         auth_header = self.authorization_header(request)
         if auth_header is not None:
+            user = self.cached_user(auth_header)
+            if user is not None:
+                return user
             token = self.extract_base64_authorization_header(auth_header)
             if token is not None:
                 decoded = self.decode_base64_authorization_header(token)
                 if decoded is not None:
                     email, password = self.extract_user_credentials(decoded)
                     if email is not None:
-                        return self.user_object_from_credentials(
+                        user = self.user_object_from_credentials(
                             email, password)
+                        if user is not None:
+                            self.cache_user(auth_header, user)
+                        return user
 
         return None
+
+    def cache_key(self, authorization_header: str) -> bytes:
+        """
+        Returns the HMAC of the authorization header used as cache key.
+        """
+        return hmac.new(CACHE_KEY, authorization_header.encode('utf-8'),
+                        hashlib.sha256).digest()
+
+    def cached_user(self,
+                    authorization_header: str) -> Optional[TypeVar('User')]:
+        """
+        Returns the user verified earlier for this authorization header,
+        or None if not cached, expired, removed or its password changed.
+        """
+        key = self.cache_key(authorization_header)
+        with self.verified_lock:
+            entry = self.verified.get(key)
+            if entry is None:
+                return None
+            user_id, password_hash, expires = entry
+            if expires < time.monotonic():
+                del self.verified[key]
+                return None
+            self.verified.move_to_end(key)
+        user = User.get(user_id)
+        if user is None or user.password != password_hash:
+            with self.verified_lock:
+                self.verified.pop(key, None)
+            return None
+        return user
+
+    def cache_user(self, authorization_header: str,
+                   user: TypeVar('User')):
+        """
+        Remembers the user verified for this authorization header.
+        """
+        key = self.cache_key(authorization_header)
+        with self.verified_lock:
+            self.verified[key] = (user.id, user.password,
+                                  time.monotonic() + CACHE_TTL)
+            self.verified.move_to_end(key)
+            while len(self.verified) > CACHE_SIZE:
+                self.verified.popitem(last=False)
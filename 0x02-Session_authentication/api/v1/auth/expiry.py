@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Module of the session expiry heap
+"""
+from typing import Callable, Dict
+import heapq
+import threading
+import time
+
+
+class ExpiryHeap():
+    """ Min-heap of session ids keyed by expiry time
+
+    `sweep()` pops the expired entries and hands them to a `reclaim`
+    callback, which returns False for entries that are stale (the session
+    was destroyed or replaced since). Each entry is pushed and popped once,
+    so a session costs O(log n) to reclaim whenever it happens; sweeping a
+    few entries on each write keeps up with the sessions created. A daemon
+    thread can also sweep every `interval` seconds.
+    """
+
+    def __init__(self):
+        """ Initialize an empty heap
+        """
+        self.heap = []
+        self.lock = threading.Lock()
+        self.reclaimed = 0
+        self.thread = None
+
+    def __len__(self) -> int:
+        """ Number of entries waiting for their expiry
+        """
+        return len(self.heap)
+
+    def push(self, expires_at: float, session_id: str):
+        """ Schedule `session_id` to expire at `expires_at` (epoch seconds)
+        """
+        with self.lock:
+            heapq.heappush(self.heap, (expires_at, session_id))
+
+    def sweep(self, reclaim: Callable[[str, float], bool],
+              now: float = None, limit: int = None) -> int:
+        """ Reclaim up to `limit` (all if None) entries expired at `now`,
+        return how many were
+        """
+        now = time.time() if now is None else now
+        count = 0
+        with self.lock:
+            heap = self.heap
+            while heap and heap[0][0] <= now and \
+                    (limit is None or count < limit):
+                expires_at, session_id = heapq.heappop(heap)
+                if reclaim(session_id, expires_at):
+                    count += 1
+            self.reclaimed += count
+        return count
+
+    def start(self, reclaim: Callable[[str, float], bool], interval: float):
+        """ Sweep every `interval` seconds in a daemon thread, once started
+        """
+        with self.lock:
+            if self.thread is not None:
+                return
+            self.thread = threading.Thread(target=self._run,
+                                           args=(reclaim, interval),
+                                           name='session-sweeper',
+                                           daemon=True)
+            self.thread.start()
+
+    def metrics(self) -> Dict[str, int]:
+        """ Return the heap counters
+        """
+        with self.lock:
+            return {'pending_expiry': len(self.heap),
+                    'reclaimed': self.reclaimed}
+
+    def _run(self, reclaim: Callable[[str, float], bool], interval: float):
+        """ Background loop
+        """
+        while True:
+            time.sleep(interval)
+            self.sweep(reclaim)
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Module of the revocation list of signed session tokens
+"""
+from api.v1.auth.expiry import ExpiryHeap
+from models.atomic import atomic_write
+from models.filelock import FileLock
+from typing import Dict, Optional
+from os import path
+import os
+import threading
+import time
+
+
+class RevocationList():
+    """ Keys (token IDs, users) revoked before their expiry
+
+    A token only needs to stay listed until it expires: entries are kept
+    in a dict with their expiry time and revocation time, and pruned
+    through an `ExpiryHeap` every `prune_interval` seconds, so the list
+    holds the logouts of the last `SESSION_DURATION` seconds at most.
+
+    With a `log_path`, revocations are also appended to that file as
+    `<key> <expiry> <revocation time>` lines, and each process reads the
+    lines the others appended before answering `revoked_at()` (one `stat`
+    when nothing changed). Appends and the periodic rewrite dropping expired
+    lines hold a `FileLock`.
+    """
+
+    def __init__(self, log_path: Optional[str] = None,
+                 prune_interval: float = 60):
+        """ Initialize an empty RevocationList
+        """
+        self.revoked = {}
+        self.expiry = ExpiryHeap()
+        self.lock = threading.Lock()
+        self.log_path = log_path
+        self.file_lock = FileLock("{}.lock".format(log_path)) \
+            if log_path else None
+        self.log_inode = None
+        self.log_offset = 0
+        self.prune_interval = prune_interval
+        self.next_prune = time.time() + prune_interval
+
+    def revoke(self, key: str, expires_at: float):
+        """ Revoke `key` now, until `expires_at` (epoch seconds, 0 for
+        never)
+        """
+        revoked_at = time.time()
+        self.add(key, expires_at, revoked_at)
+        self.prune_if_due()
+        if self.log_path:
+            with self.file_lock.exclusive():
+                with open(self.log_path, 'a') as f:
+                    f.write("{} {} {!r}\n".format(key, expires_at,
+                                                  revoked_at))
+
+    def revoked_at(self, key: str) -> Optional[float]:
+        """ Return when `key` was revoked, None if it was not
+        """
+        self.prune_if_due()
+        if self.log_path:
+            self.refresh()
+        entry = self.revoked.get(key)
+        return entry[1] if entry is not None else None
+
+    def is_revoked(self, key: str) -> bool:
+        """ Check whether `key` was revoked
+        """
+        return self.revoked_at(key) is not None
+
+    def add(self, key: str, expires_at: float, revoked_at: float):
+        """ List a key in this process
+
+        A key revoked again (a user logged out everywhere twice) keeps the
+        latest revocation and expiry times of the two.
+        """
+        with self.lock:
+            entry = self.revoked.get(key)
+            if entry is not None:
+                if expires_at and entry[0]:
+                    expires_at = max(expires_at, entry[0])
+                else:
+                    expires_at = 0
+                revoked_at = max(revoked_at, entry[1])
+                if (expires_at, revoked_at) == entry:
+                    return
+            self.revoked[key] = (expires_at, revoked_at)
+        if expires_at:
+            self.expiry.push(expires_at, key)
+
+    def refresh(self):
+        """ Read the revocations appended to the log by other processes
+        """
+        try:
+            st = os.stat(self.log_path)
+        except FileNotFoundError:
+            return
+        if st.st_ino == self.log_inode and st.st_size == self.log_offset:
+            return
+        with self.lock:
+            offset = self.log_offset if st.st_ino == self.log_inode else 0
+            with open(self.log_path, 'rb') as f:
+                f.seek(offset)
+                data = f.read()
+            end = data.rfind(b'\n') + 1
+            self.log_inode, self.log_offset = st.st_ino, offset + end
+        now = time.time()
+        for line in data[:end].splitlines():
+            key, expires_at, revoked_at = line.decode('ascii').split(' ')
+            expires_at, revoked_at = float(expires_at), float(revoked_at)
+            if not expires_at or expires_at > now:
+                self.add(key, expires_at, revoked_at)
+
+    def prune_if_due(self):
+        """ Prune if `prune_interval` elapsed since the last time
+        """
+        now = time.time()
+        if now >= self.next_prune:
+            self.prune(now)
+
+    def prune(self, now: float):
+        """ Drop the expired tokens, and their lines from the log
+        """
+        self.next_prune = now + self.prune_interval
+        self.expiry.sweep(self.discard, now)
+        if not self.log_path or not path.exists(self.log_path):
+            return
+        with self.file_lock.exclusive():
+            with open(self.log_path, 'r') as f:
+                lines = f.readlines()
+            kept = [line for line in lines if line.endswith('\n') and
+                    self.live(line, now)]
+            if len(kept) < len(lines):
+                with atomic_write(self.log_path) as f:
+                    f.write(''.join(kept))
+
+    @staticmethod
+    def live(line: str, now: float) -> bool:
+        """ Check whether the key of a log line is still unexpired
+        """
+        expires_at = float(line.split(' ')[1])
+        return not expires_at or expires_at > now
+
+    def discard(self, key: str, expires_at: float) -> bool:
+        """ Unlist an expired key
+        """
+        with self.lock:
+            entry = self.revoked.get(key)
+            if entry is None or entry[0] != expires_at:
+                return False
+            del self.revoked[key]
+            return True
+
+    def metrics(self) -> Dict[str, int]:
+        """ Return the list counters
+        """
+        self.prune_if_due()
+        return {'revoked': len(self.revoked),
+                'pruned': self.expiry.metrics()['reclaimed']}
@@ -2,19 +2,40 @@
 """API session authentication module"""
 
 from api.v1.auth.auth import Auth
+from api.v1.auth.session_store import session_store
+from collections import OrderedDict
 from models.user import User
+from os import getenv
+from typing import List
+import threading
 import uuid
 
 
+MAX_SESSIONS_PER_USER = int(getenv('SESSION_MAX_PER_USER', 0))
+
+
 class SessionAuth(Auth):
     """
     Session Authentication Class
 
     This class provides methods for creating and managing user sessions
     using session IDs.
+
+    Sessions are kept in `user_id_by_session_id`, a dict private to the
+    process unless `SESSION_STORE` selects a shared store.
+
+    `session_ids_by_user_id` indexes them by user, least recently used
+    first, unless the store indexes them itself (`session_ids()`, kept in
+    use order through `touch()` by a `SessionTable`, in creation order by a
+    `SQLiteSessionStore`). Users keep at most `SESSION_MAX_PER_USER`
+    sessions (unlimited if 0): a new login evicts the least recently used
+    ones, or the oldest ones with the SQLite store.
     """
 
-    user_id_by_session_id = {}
+    user_id_by_session_id = session_store()
+    session_ids_by_user_id = {}
+    index_lock = threading.Lock()
+    indexed = not hasattr(user_id_by_session_id, 'session_ids')
 
     def create_session(self, user_id: str = None) -> str:
         """Create Session ID
@@ -35,6 +56,11 @@ class SessionAuth(Auth):
 
         session_id = str(uuid.uuid4())
         self.user_id_by_session_id[session_id] = user_id
+        if self.indexed:
+            with self.index_lock:
+                self.session_ids_by_user_id.setdefault(
+                    user_id, OrderedDict())[session_id] = None
+        self.evict_sessions(user_id)
 
         return session_id
 
@@ -72,6 +98,15 @@ class SessionAuth(Auth):
 
         session_id = self.session_cookie(request)
         user_id = self.user_id_for_session_id(session_id)
+        if user_id is None:
+            pass
+        elif self.indexed:
+            with self.index_lock:
+                sessions = self.session_ids_by_user_id.get(user_id)
+                if sessions is not None and session_id in sessions:
+                    sessions.move_to_end(session_id)
+        elif hasattr(self.user_id_by_session_id, 'touch'):
+            self.user_id_by_session_id.touch(session_id)
         return User.get(user_id)
 
     def destroy_session(self, request=None):
@@ -94,5 +129,83 @@ class SessionAuth(Auth):
         cookie = self.session_cookie(request)
         if cookie is None or self.user_id_for_session_id(cookie) is None:
             return False
-        del self.user_id_by_session_id[cookie]
+        return self.delete_session(cookie)
+
+    def delete_session(self, session_id: str) -> bool:
+        """
+        Delete Session
+
+        Remove a session ID from the store. Every deletion (logout, expiry)
+        goes through this method.
+
+        Args:
+            session_id (str): The session ID.
+
+        Returns:
+            bool: True if the session existed, False otherwise.
+        """
+
+        value = self.user_id_by_session_id.pop(session_id, None)
+        if value is None:
+            return False
+        user_id = value.get('user_id') if isinstance(value, dict) else value
+        if self.indexed:
+            with self.index_lock:
+                sessions = self.session_ids_by_user_id.get(user_id)
+                if sessions is not None:
+                    sessions.pop(session_id, None)
+                    if not sessions:
+                        del self.session_ids_by_user_id[user_id]
         return True
+
+    def user_session_ids(self, user_id: str) -> List[str]:
+        """
+        Get User Session IDs
+
+        Args:
+            user_id (str): The ID of the user.
+
+        Returns:
+            list: The session IDs of the user, least recently used first.
+        """
+
+        if not self.indexed:
+            return self.user_id_by_session_id.session_ids(user_id)
+        with self.index_lock:
+            return list(self.session_ids_by_user_id.get(user_id, ()))
+
+    def evict_sessions(self, user_id: str) -> int:
+        """
+        Evict Sessions
+
+        Delete the least recently used sessions of a user beyond
+        `SESSION_MAX_PER_USER`.
+
+        Args:
+            user_id (str): The ID of the user.
+
+        Returns:
+            int: The number of sessions deleted.
+        """
+
+        if MAX_SESSIONS_PER_USER <= 0:
+            return 0
+        session_ids = self.user_session_ids(user_id)
+        return sum(self.delete_session(session_id) for session_id in
+                   session_ids[:-MAX_SESSIONS_PER_USER])
+
+    def destroy_all_sessions(self, user_id: str) -> int:
+        """
+        Destroy All Sessions
+
+        Log a user out everywhere, in O(number of their sessions).
+
+        Args:
+            user_id (str): The ID of the user.
+
+        Returns:
+            int: The number of sessions deleted.
+        """
+
+        return sum(self.delete_session(session_id) for session_id in
+                   self.user_session_ids(user_id))
@@ -3,12 +3,49 @@
 API session db module
 """
 
-from api.v1.auth.session_exp_auth import SessionExpAuth
-from os import getenv
+from api.v1.auth.expiry import ExpiryHeap
+from api.v1.auth.session_exp_auth import SessionExpAuth, SWEEP_BATCH
+from datetime import datetime, timedelta, timezone
+from models.user_session import UserSession
+from typing import List
+import uuid
 
 
 class SessionDBAuth(SessionExpAuth):
-    """ Session DB Auth """
+    """ Session DB Auth
+
+    Sessions are `UserSession` objects, found by `session_id` through the
+    index of the class and written behind, so logins and logouts do not
+    rewrite the file. Sessions expire `SESSION_DURATION` seconds after
+    their creation and are reclaimed through `expiry` like in
+    `SessionExpAuth`. The sessions of a user are found through the
+    `user_id` index; beyond `SESSION_MAX_PER_USER`, the oldest are
+    evicted.
+    """
+
+    expiry = ExpiryHeap()
+
+    def __init__(self):
+        """Initializes the `SessionDBAuth` object, loading the stored
+        sessions.
+
+        Returns:
+            None
+        """
+        super().__init__()
+        UserSession.load_from_file()
+        if self.session_duration > 0:
+            for user_session in UserSession.all():
+                self.expiry.push(self.expires_at(user_session),
+                                 user_session.session_id)
+
+    def session_expiry(self) -> ExpiryHeap:
+        """Returns the heap reclaiming the expired `UserSession` objects.
+
+        Returns:
+            ExpiryHeap: The heap of the class.
+        """
+        return SessionDBAuth.expiry
 
     def create_session(self, user_id: str = None) -> str:
         """Creates a new session ID for the given user ID.
@@ -21,7 +58,19 @@ class SessionDBAuth(SessionExpAuth):
 
         """
 
-        pass
+        if user_id is None or not isinstance(user_id, str):
+            return None
+
+        session_id = str(uuid.uuid4())
+        user_session = UserSession(user_id=user_id, session_id=session_id)
+        user_session.save()
+        self.evict_sessions(user_id)
+
+        if self.session_duration > 0:
+            self.expiry.push(self.expires_at(user_session), session_id)
+            self.expiry.sweep(self.reclaim_session, limit=SWEEP_BATCH)
+
+        return session_id
 
     def user_id_for_session_id(self, session_id: str = None) -> str:
         """Retrieves the user ID associated with the provided session ID.
@@ -31,13 +80,24 @@ class SessionDBAuth(SessionExpAuth):
 
         Returns:
             str: The user ID associated with the session ID, or
-            None if not found.
+            None if not found or expired.
         """
 
         if session_id is None or isinstance(session_id, str) is False:
             return None
-        else:
-            pass
+
+        user_sessions = UserSession.search({'session_id': session_id})
+        if not user_sessions:
+            return None
+        user_session = user_sessions[0]
+
+        if self.session_duration > 0:
+            session_elapsed = timedelta(seconds=self.session_duration)
+            if user_session.created_at + session_elapsed < \
+                    datetime.utcnow():
+                return None
+
+        return user_session.user_id
 
     def destroy_session(self, request=None):
         """
@@ -48,7 +108,93 @@ class SessionDBAuth(SessionExpAuth):
             to be destroyed.
 
         Returns:
-            None
+            bool: True if the session was destroyed, False otherwise.
+
+        """
+        if request is None:
+            return False
+        session_id = self.session_cookie(request)
+        if session_id is None:
+            return False
+        return self.delete_session(session_id)
+
+    def delete_session(self, session_id: str) -> bool:
+        """Deletes the `UserSession` objects of a session ID.
+
+        Args:
+            session_id (str): The session ID.
+
+        Returns:
+            bool: True if the session existed, False otherwise.
+        """
+        user_sessions = UserSession.search({'session_id': session_id})
+        if not user_sessions:
+            return False
+        UserSession.remove_many(user_sessions)
+        return True
 
+    def user_session_ids(self, user_id: str) -> List[str]:
+        """Returns the session IDs of a user.
+
+        Args:
+            user_id (str): The ID of the user.
+
+        Returns:
+            list: The session IDs of the user, oldest first.
+        """
+        user_sessions = UserSession.search({'user_id': user_id})
+        user_sessions.sort(key=lambda user_session: user_session.created_at)
+        return [user_session.session_id for user_session in user_sessions]
+
+    def destroy_all_sessions(self, user_id: str) -> int:
+        """Deletes every session of a user in one write.
+
+        Args:
+            user_id (str): The ID of the user.
+
+        Returns:
+            int: The number of sessions deleted.
+        """
+        user_sessions = UserSession.search({'user_id': user_id})
+        UserSession.remove_many(user_sessions)
+        return len(user_sessions)
+
+    def expires_at(self, user_session: UserSession) -> float:
+        """Returns the expiry time of a session, in epoch seconds.
+
+        Args:
+            user_session (UserSession): The session.
+
+        Returns:
+            float: The time after which the session is expired.
+        """
+        created_at = user_session.created_at.replace(tzinfo=timezone.utc)
+        return created_at.timestamp() + self.session_duration
+
+    def reclaim_session(self, session_id: str, expires_at: float) -> bool:
+        """Deletes an expired session, unless it was destroyed since it
+        was scheduled.
+
+        Args:
+            session_id (str): The session ID.
+            expires_at (float): The expiry time it was scheduled with.
+
+        Returns:
+            bool: True if the session was deleted.
+        """
+        user_sessions = [
+            user_session for user_session in
+            UserSession.search({'session_id': session_id})
+            if self.expires_at(user_session) == expires_at]
+        if not user_sessions:
+            return False
+        UserSession.remove_many(user_sessions)
+        return True
+
+    def session_count(self) -> int:
+        """Returns the number of stored sessions.
+
+        Returns:
+            int: The number of `UserSession` objects.
         """
-        pass
+        return UserSession.count()
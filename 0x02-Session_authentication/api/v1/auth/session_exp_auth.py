@@ -3,11 +3,18 @@
 API session expiration module
 """
 
+from api.v1.auth.expiry import ExpiryHeap
 from api.v1.auth.session_auth import SessionAuth
+from api.v1.auth.session_store import SQLiteSessionStore
+from api.v1.auth.session_table import SessionTable, TableExpiry
 from os import getenv
 from datetime import datetime, timedelta
 
 
+SWEEP_BATCH = int(getenv('SESSION_SWEEP_BATCH', 2))
+SWEEP_INTERVAL = float(getenv('SESSION_SWEEP_INTERVAL', 0))
+
+
 class SessionExpAuth(SessionAuth):
     """The `SessionExpAuth` class extends the functionality of `SessionAuth`
     class by adding session expiration feature.
@@ -25,8 +32,20 @@ class SessionExpAuth(SessionAuth):
         user_id_for_session_id(session_id: str = None) -> str: Retrieves the
         user ID associated with a session ID if the session is valid and not
         expired.
+        session_metrics() -> dict: Returns the live and reclaimed session
+        counts, without sweeping.
+
+    Expired sessions are reclaimed from `user_id_by_session_id` through
+    `expiry`, a heap keyed by expiry time: each `create_session` sweeps at
+    most `SESSION_SWEEP_BATCH` of them, and a daemon thread sweeps them all
+    every `SESSION_SWEEP_INTERVAL` seconds if set. `SessionTable` and
+    `SQLiteSessionStore` stores hold the creation times themselves and are
+    swept in place by a `TableExpiry` instead, which also reclaims the
+    sessions created by other processes.
     """
 
+    expiry = ExpiryHeap()
+
     def __init__(self):
         """Initializes the `SessionExpAuth` object by setting the session
         duration based on the environment variable 'SESSION_DURATION'.
@@ -38,6 +57,22 @@ class SessionExpAuth(SessionAuth):
             self.session_duration = int(getenv('SESSION_DURATION'))
         except Exception:
             self.session_duration = 0
+        self.expiry = self.session_expiry()
+        if SWEEP_INTERVAL > 0 and self.session_duration > 0:
+            self.expiry.start(self.reclaim_session, SWEEP_INTERVAL)
+
+    def session_expiry(self) -> ExpiryHeap:
+        """Returns what reclaims the expired sessions of the store.
+
+        Returns:
+            ExpiryHeap: The heap of the class, or a `TableExpiry` for a
+            `SessionTable` or `SQLiteSessionStore` store.
+        """
+        if isinstance(self.user_id_by_session_id,
+                      (SessionTable, SQLiteSessionStore)):
+            return TableExpiry(self.user_id_by_session_id,
+                               self.session_duration)
+        return SessionExpAuth.expiry
 
     def create_session(self, user_id: str = None) -> str:
         """Creates a new session ID for a given user ID and stores
@@ -54,6 +89,9 @@ class SessionExpAuth(SessionAuth):
         except Exception:
             return None
 
+        if session_id is None:
+            return None
+
         session_dictionary = {
             'user_id': user_id,
             'created_at': datetime.now()
@@ -61,6 +99,10 @@ class SessionExpAuth(SessionAuth):
 
         self.user_id_by_session_id[session_id] = session_dictionary
 
+        if self.session_duration > 0:
+            self.expiry.push(self.expires_at(session_dictionary), session_id)
+            self.expiry.sweep(self.reclaim_session, limit=SWEEP_BATCH)
+
         return session_id
 
     def user_id_for_session_id(self, session_id: str = None) -> str:
@@ -92,3 +134,54 @@ class SessionExpAuth(SessionAuth):
             return None
         else:
             return session_dict.get('user_id')
+
+    def expires_at(self, session_dict: dict) -> float:
+        """Returns the expiry time of a session, in epoch seconds.
+
+        Args:
+            session_dict (dict): The session, as stored.
+
+        Returns:
+            float: The time after which the session is expired.
+        """
+        return session_dict['created_at'].timestamp() + self.session_duration
+
+    def reclaim_session(self, session_id: str, expires_at: float) -> bool:
+        """Deletes an expired session, unless it was destroyed or
+        replaced since it was scheduled.
+
+        Args:
+            session_id (str): The session ID.
+            expires_at (float): The expiry time it was scheduled with.
+
+        Returns:
+            bool: True if the session was deleted.
+        """
+        session_dict = self.user_id_by_session_id.get(session_id)
+        if not isinstance(session_dict, dict) or \
+                'created_at' not in session_dict or \
+                self.expires_at(session_dict) != expires_at:
+            return False
+        return self.delete_session(session_id)
+
+    def session_metrics(self) -> dict:
+        """Returns the session counters, without sweeping: expired
+        sessions are counted as `live` until a login or the sweeping
+        thread reclaims them.
+
+        Returns:
+            dict: `live` sessions, entries `pending_expiry` in the heap
+            and sessions `reclaimed` since startup.
+        """
+        metrics = self.expiry.metrics()
+        metrics['live'] = self.session_count()
+        return metrics
+
+    def session_count(self) -> int:
+        """Returns the number of stored sessions.
+
+        Returns:
+            int: The number of sessions, expired ones included until
+            they are reclaimed.
+        """
+        return len(self.user_id_by_session_id)
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Module of the session stores
+
+`SessionAuth.user_id_by_session_id` maps each session ID to a user ID (or
+to a `{'user_id', 'created_at'}` dict for expiring sessions). It is a
+plain dict by default, private to the process; with
+`SESSION_STORE=compact` it is a `SessionTable`, private as well but an
+order of magnitude smaller; with `SESSION_STORE=sqlite` it is a
+`SQLiteSessionStore` shared by every process using the same
+`SESSION_STORE_PATH`.
+"""
+from collections.abc import MutableMapping
+from datetime import datetime
+from os import getenv
+from typing import Iterator, List, Optional, Tuple, Union
+import os
+import sqlite3
+import threading
+
+
+class SQLiteSessionStore(MutableMapping):
+    """ Sessions stored in a SQLite database in WAL mode
+
+    Reads are served from an in-process cache, dropped as soon as
+    `PRAGMA data_version` reports a commit from another connection (i.e.
+    another process), so every process sees every login and logout.
+    One connection per process, serialized by a lock. `session_ids()`
+    finds the sessions of a user through an index on `user_id`, and
+    `scan()` the expired sessions through an index on `created_at`, so
+    sessions left by any process, running or not, are reclaimed. Uses are
+    not recorded, which would write the database on every request: the
+    sessions of a user are ordered by creation, and evicted oldest first.
+    """
+
+    def __init__(self, db_path: str, cache_size: int = 100000):
+        """ Initialize a store on the database file `db_path`
+        """
+        self.db_path = db_path
+        self.cache_size = cache_size
+        self.lock = threading.Lock()
+        self.conn = None
+        self.pid = None
+        self.version = None
+        self.cache = {}
+
+    def connection(self) -> sqlite3.Connection:
+        """ Return the connection of the process, dropping the cache if
+        another connection committed since the last call
+        """
+        if self.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, check_same_thread=False,
+                                   isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS sessions ("
+                         "session_id TEXT PRIMARY KEY, user_id TEXT, "
+                         "created_at TEXT)")
+            conn.execute("CREATE INDEX IF NOT EXISTS sessions_user_id "
+                         "ON sessions (user_id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS sessions_created_at "
+                         "ON sessions (created_at)")
+            self.conn, self.pid, self.version = conn, os.getpid(), None
+        version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        if version != self.version:
+            self.cache.clear()
+            self.version = version
+        return self.conn
+
+    @staticmethod
+    def decode(row: tuple) -> Union[str, dict]:
+        """ Return the value of a `(user_id, created_at)` row
+        """
+        user_id, created_at = row
+        if created_at is None:
+            return user_id
+        return {'user_id': user_id,
+                'created_at': datetime.fromisoformat(created_at)}
+
+    @staticmethod
+    def encode(value: Union[str, dict]) -> tuple:
+        """ Return the `(user_id, created_at)` row of a value
+        """
+        if isinstance(value, dict):
+            return value.get('user_id'), value['created_at'].isoformat()
+        return value, None
+
+    def __getitem__(self, session_id: str) -> Union[str, dict]:
+        """ Return the value of `session_id`
+        """
+        with self.lock:
+            conn = self.connection()
+            value = self.cache.get(session_id)
+            if value is None:
+                row = conn.execute(
+                    "SELECT user_id, created_at FROM sessions "
+                    "WHERE session_id = ?", (session_id,)).fetchone()
+                if row is None:
+                    raise KeyError(session_id)
+                value = self.decode(row)
+                self.remember(session_id, value)
+            return value
+
+    def __setitem__(self, session_id: str, value: Union[str, dict]):
+        """ Store the value of `session_id`
+        """
+        with self.lock:
+            conn = self.connection()
+            conn.execute("INSERT OR REPLACE INTO sessions "
+                         "(session_id, user_id, created_at) VALUES (?, ?, ?)",
+                         (session_id, *self.encode(value)))
+            self.remember(session_id, value)
+
+    def __delitem__(self, session_id: str):
+        """ Delete `session_id`
+        """
+        if self.pop(session_id, None) is None:
+            raise KeyError(session_id)
+
+    def pop(self, session_id: str, *default) -> Optional[Union[str, dict]]:
+        """ Delete `session_id` and return its value
+        """
+        with self.lock:
+            conn = self.connection()
+            self.cache.pop(session_id, None)
+            row = conn.execute(
+                "SELECT user_id, created_at FROM sessions "
+                "WHERE session_id = ?", (session_id,)).fetchone()
+            if row is not None and not conn.execute(
+                    "DELETE FROM sessions WHERE session_id = ?",
+                    (session_id,)).rowcount:
+                row = None
+        if row is not None:
+            return self.decode(row)
+        if default:
+            return default[0]
+        raise KeyError(session_id)
+
+    def __iter__(self) -> Iterator[str]:
+        """ Iterate over the session IDs
+        """
+        with self.lock:
+            rows = self.connection().execute(
+                "SELECT session_id FROM sessions").fetchall()
+        return (row[0] for row in rows)
+
+    def __len__(self) -> int:
+        """ Number of sessions
+        """
+        with self.lock:
+            return self.connection().execute(
+                "SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def clear(self):
+        """ Delete every session
+        """
+        with self.lock:
+            self.connection().execute("DELETE FROM sessions")
+            self.cache.clear()
+
+    def session_ids(self, user_id: str) -> List[str]:
+        """ Return the session IDs of `user_id`, oldest first (created
+        first, whatever their use)
+        """
+        with self.lock:
+            rows = self.connection().execute(
+                "SELECT session_id FROM sessions WHERE user_id = ? "
+                "ORDER BY rowid", (user_id,)).fetchall()
+        return [row[0] for row in rows]
+
+    def scan(self, created_before: int,
+             count: int = None) -> List[Tuple[str, float]]:
+        """ Return `(session ID, creation time)` of the `count` oldest
+        sessions (all if None) created at `created_before` or earlier
+        """
+        cutoff = datetime.fromtimestamp(created_before).isoformat()
+        with self.lock:
+            rows = self.connection().execute(
+                "SELECT session_id, created_at FROM sessions "
+                "WHERE created_at <= ? ORDER BY created_at LIMIT ?",
+                (cutoff, -1 if count is None else count)).fetchall()
+        return [(session_id, datetime.fromisoformat(created_at).timestamp())
+                for session_id, created_at in rows]
+
+    def remember(self, session_id: str, value: Union[str, dict]):
+        """ Cache a value, evicting the oldest one if the cache is full
+        """
+        if len(self.cache) >= self.cache_size:
+            del self.cache[next(iter(self.cache))]
+        self.cache[session_id] = value
+
+
+def session_store() -> MutableMapping:
+    """ Return the session store selected by `SESSION_STORE`
+    """
+    store = getenv('SESSION_STORE', 'memory')
+    if store == 'memory':
+        return {}
+    if store == 'compact':
+        from api.v1.auth.session_table import SessionTable
+        return SessionTable()
+    if store == 'sqlite':
+        return SQLiteSessionStore(
+            getenv('SESSION_STORE_PATH', '.sessions.sqlite3'),
+            int(getenv('SESSION_STORE_CACHE_SIZE', 100000)))
+    raise ValueError("unknown session store '{}'".format(store))
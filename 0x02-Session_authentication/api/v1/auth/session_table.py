@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+"""
+Module of the compact session table
+"""
+from api.v1.auth.expiry import ExpiryHeap
+from array import array
+from collections.abc import MutableMapping
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Tuple, Union
+import threading
+import time
+
+
+EMPTY = -1
+DELETED = -2
+KEY_SIZE = 16
+# rows scanned per lock hold by a full sweep
+SWEEP_CHUNK = 4096
+
+
+class SessionTable(MutableMapping):
+    """ Sessions stored in flat arrays, under 100 bytes each
+
+    Each session is a row: its ID as 16 bytes (session IDs are UUIDs), its
+    creation time in epoch seconds (-1 for sessions without one) and a
+    reference to its user. User IDs are stored once per user, and the
+    sessions of a user are chained in least recently used order (`touch()`
+    moves a session to the end), so `session_ids()` is O(sessions of the
+    user). Rows are found through an open-addressing
+    table (linear probing, at most half full) and reused once deleted.
+
+    Values read back are the same as in a dict store: the user ID, or a
+    `{'user_id', 'created_at'}` dict with `created_at` rounded down to the
+    second.
+    """
+
+    def __init__(self):
+        """ Initialize an empty table
+        """
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """ Drop every row and user
+        """
+        self.keys = bytearray()
+        self.created = array('q')
+        self.owners = array('i')
+        self.prev = array('i')
+        self.next = array('i')
+        self.free_rows = array('i')
+        self.index = array('i', [EMPTY]) * 8
+        self.filled = 0
+        self.size = 0
+        self.user_refs = {}
+        self.user_ids = []
+        self.heads = array('i')
+        self.tails = array('i')
+        self.free_users = array('i')
+        self.cursor = 0
+
+    @staticmethod
+    def pack(session_id: str) -> bytes:
+        """ Return the 16 bytes of a session ID, ValueError if it is not a
+        UUID
+        """
+        if not isinstance(session_id, str) or len(session_id) != 36 or \
+                session_id[8] != '-' or session_id[13] != '-' or \
+                session_id[18] != '-' or session_id[23] != '-':
+            raise ValueError(session_id)
+        return bytes.fromhex(session_id.replace('-', ''))
+
+    def find(self, key: bytes) -> Tuple[int, int]:
+        """ Return the index slot and row of `key`, or the slot to insert
+        it at and -1
+        """
+        index = self.index
+        mask = len(index) - 1
+        slot = hash(key) & mask
+        insert_at = -1
+        while True:
+            row = index[slot]
+            if row == EMPTY:
+                return (slot if insert_at < 0 else insert_at), -1
+            if row == DELETED:
+                if insert_at < 0:
+                    insert_at = slot
+            elif self.keys[row * KEY_SIZE:(row + 1) * KEY_SIZE] == key:
+                return slot, row
+            slot = (slot + 1) & mask
+
+    def resize(self):
+        """ Rebuild the index at four times the number of sessions, at least
+        """
+        length = 8
+        while length < 4 * (self.size + 1):
+            length *= 2
+        index = array('i', [EMPTY]) * length
+        mask = length - 1
+        keys = self.keys
+        for row in range(len(self.owners)):
+            if self.owners[row] < 0:
+                continue
+            slot = hash(bytes(keys[row * KEY_SIZE:(row + 1) * KEY_SIZE])) \
+                & mask
+            while index[slot] != EMPTY:
+                slot = (slot + 1) & mask
+            index[slot] = row
+        self.index = index
+        self.filled = self.size
+
+    def user_ref(self, user_id: str) -> int:
+        """ Return the reference of `user_id`, adding it if needed
+        """
+        ref = self.user_refs.get(user_id)
+        if ref is not None:
+            return ref
+        if self.free_users:
+            ref = self.free_users.pop()
+            self.user_ids[ref] = user_id
+        else:
+            ref = len(self.user_ids)
+            self.user_ids.append(user_id)
+            self.heads.append(-1)
+            self.tails.append(-1)
+        self.user_refs[user_id] = ref
+        return ref
+
+    def link(self, row: int, ref: int):
+        """ Append `row` to the sessions of user `ref`
+        """
+        tail = self.tails[ref]
+        self.owners[row] = ref
+        self.prev[row] = tail
+        self.next[row] = -1
+        if tail < 0:
+            self.heads[ref] = row
+        else:
+            self.next[tail] = row
+        self.tails[ref] = row
+
+    def unlink(self, row: int):
+        """ Remove `row` from the sessions of its user, dropping the user
+        once it has none
+        """
+        ref = self.owners[row]
+        prev, following = self.prev[row], self.next[row]
+        if prev < 0:
+            self.heads[ref] = following
+        else:
+            self.next[prev] = following
+        if following < 0:
+            self.tails[ref] = prev
+        else:
+            self.prev[following] = prev
+        self.owners[row] = -1
+        if self.heads[ref] < 0:
+            del self.user_refs[self.user_ids[ref]]
+            self.user_ids[ref] = None
+            self.free_users.append(ref)
+
+    def value(self, row: int) -> Union[str, dict]:
+        """ Return the value stored in `row`
+        """
+        user_id = self.user_ids[self.owners[row]]
+        created = self.created[row]
+        if created < 0:
+            return user_id
+        return {'user_id': user_id,
+                'created_at': datetime.fromtimestamp(created)}
+
+    def session_id(self, row: int) -> str:
+        """ Return the session ID stored in `row`
+        """
+        digits = self.keys[row * KEY_SIZE:(row + 1) * KEY_SIZE].hex()
+        return "{}-{}-{}-{}-{}".format(digits[:8], digits[8:12],
+                                       digits[12:16], digits[16:20],
+                                       digits[20:])
+
+    def __getitem__(self, session_id: str) -> Union[str, dict]:
+        """ Return the value of `session_id`
+        """
+        try:
+            key = self.pack(session_id)
+        except ValueError:
+            raise KeyError(session_id)
+        with self.lock:
+            row = self.find(key)[1]
+            if row < 0:
+                raise KeyError(session_id)
+            return self.value(row)
+
+    def __setitem__(self, session_id: str, value: Union[str, dict]):
+        """ Store the value of `session_id`, a user ID or a
+        `{'user_id', 'created_at'}` dict
+        """
+        key = self.pack(session_id)
+        if isinstance(value, dict):
+            user_id = value.get('user_id')
+            created = int(value['created_at'].timestamp())
+        else:
+            user_id, created = value, -1
+        with self.lock:
+            slot, row = self.find(key)
+            if row >= 0:
+                self.created[row] = created
+                if self.user_ids[self.owners[row]] != user_id:
+                    self.unlink(row)
+                    self.link(row, self.user_ref(user_id))
+                return
+            if self.free_rows:
+                row = self.free_rows.pop()
+                self.keys[row * KEY_SIZE:(row + 1) * KEY_SIZE] = key
+                self.created[row] = created
+            else:
+                row = len(self.owners)
+                self.keys += key
+                self.created.append(created)
+                self.owners.append(-1)
+                self.prev.append(-1)
+                self.next.append(-1)
+            self.link(row, self.user_ref(user_id))
+            if self.index[slot] == EMPTY:
+                self.filled += 1
+            self.index[slot] = row
+            self.size += 1
+            if 2 * self.filled > len(self.index):
+                self.resize()
+
+    def __delitem__(self, session_id: str):
+        """ Delete `session_id`
+        """
+        if self.pop(session_id, None) is None:
+            raise KeyError(session_id)
+
+    def pop(self, session_id: str, *default) -> Union[str, dict, None]:
+        """ Delete `session_id` and return its value
+        """
+        try:
+            key = self.pack(session_id)
+        except ValueError:
+            key = None
+        with self.lock:
+            slot, row = self.find(key) if key is not None else (-1, -1)
+            if row >= 0:
+                value = self.value(row)
+                self.unlink(row)
+                self.index[slot] = DELETED
+                self.free_rows.append(row)
+                self.size -= 1
+                return value
+        if default:
+            return default[0]
+        raise KeyError(session_id)
+
+    def __iter__(self) -> Iterator[str]:
+        """ Iterate over the session IDs
+        """
+        with self.lock:
+            rows = [row for row in range(len(self.owners))
+                    if self.owners[row] >= 0]
+            return iter([self.session_id(row) for row in rows])
+
+    def __len__(self) -> int:
+        """ Number of sessions
+        """
+        return self.size
+
+    def clear(self):
+        """ Delete every session
+        """
+        with self.lock:
+            self.reset()
+
+    def touch(self, session_id: str):
+        """ Move `session_id` to the end of the sessions of its user
+        """
+        try:
+            key = self.pack(session_id)
+        except ValueError:
+            return
+        with self.lock:
+            row = self.find(key)[1]
+            if row < 0 or self.next[row] < 0:
+                return
+            ref = self.owners[row]
+            prev, following = self.prev[row], self.next[row]
+            if prev < 0:
+                self.heads[ref] = following
+            else:
+                self.next[prev] = following
+            self.prev[following] = prev
+            self.link(row, ref)
+
+    def session_ids(self, user_id: str) -> List[str]:
+        """ Return the session IDs of `user_id`, least recently used first
+        """
+        with self.lock:
+            ref = self.user_refs.get(user_id)
+            session_ids = []
+            row = self.heads[ref] if ref is not None else -1
+            while row >= 0:
+                session_ids.append(self.session_id(row))
+                row = self.next[row]
+            return session_ids
+
+    def scan(self, created_before: int,
+             count: int = None) -> List[Tuple[str, int]]:
+        """ Return `(session ID, creation time)` of the sessions created
+        at `created_before` or earlier among the next `count` rows (all if
+        None), from a cursor going round the table
+        """
+        with self.lock:
+            rows = len(self.owners)
+            count = rows if count is None else min(count, rows)
+            found = []
+            for _ in range(count):
+                row = self.cursor if self.cursor < rows else 0
+                self.cursor = row + 1
+                if self.owners[row] >= 0 and \
+                        0 <= self.created[row] <= created_before:
+                    found.append((self.session_id(row), self.created[row]))
+            return found
+
+    def rows(self) -> int:
+        """ Return the number of rows, used or free
+        """
+        return len(self.owners)
+
+    def memory(self) -> int:
+        """ Return the bytes held by the arrays of the table
+        """
+        return sum(len(column) * column.itemsize for column in (
+            self.created, self.owners, self.prev, self.next, self.free_rows,
+            self.index, self.heads, self.tails, self.free_users)) + \
+            len(self.keys)
+
+
+class TableExpiry(ExpiryHeap):
+    """ Expiry of the sessions of a store holding their creation times,
+    without a heap
+
+    Expiry times are not stored apart: `sweep()` asks the `scan()` of the
+    store (a `SessionTable` or a `SQLiteSessionStore`) for `limit` sessions
+    at most created more than `ttl` seconds ago, and reclaims them. A full
+    sweep of a `SessionTable` goes round it `SWEEP_CHUNK` rows at a time,
+    reclaiming each chunk before scanning the next, so the table lock is
+    never held for long.
+    """
+
+    def __init__(self, table: MutableMapping, ttl: int):
+        """ Initialize the expiry of `table`
+        """
+        super().__init__()
+        self.table = table
+        self.ttl = ttl
+
+    def push(self, expires_at: float, session_id: str):
+        """ Nothing to do: the store holds the creation times
+        """
+
+    def sweep(self, reclaim: Callable[[str, float], bool],
+              now: float = None, limit: int = None) -> int:
+        """ Reclaim the expired sessions among `limit` rows (all if None),
+        return how many were
+        """
+        now = time.time() if now is None else now
+        if limit is None and isinstance(self.table, SessionTable):
+            chunks = [SWEEP_CHUNK] * -(-self.table.rows() // SWEEP_CHUNK)
+        else:
+            chunks = [limit]
+        count = 0
+        for chunk in chunks:
+            for session_id, created in self.table.scan(int(now) - self.ttl,
+                                                       chunk):
+                if reclaim(session_id, float(created + self.ttl)):
+                    count += 1
+        with self.lock:
+            self.reclaimed += count
+        return count
+
+    def metrics(self) -> Dict[str, int]:
+        """ Return the counters
+        """
+        with self.lock:
+            return {'pending_expiry': 0, 'reclaimed': self.reclaimed}
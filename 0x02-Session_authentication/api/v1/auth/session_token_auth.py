@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+API signed session token module
+"""
+
+from api.v1.auth.revocation import RevocationList
+from api.v1.auth.session_auth import SessionAuth
+from os import getenv
+from typing import Optional, Tuple
+import base64
+import binascii
+import hashlib
+import hmac
+import os
+import secrets
+import time
+import warnings
+
+
+# tokens signed with a per-process key are only valid in that process: set
+# SESSION_SECRET to share them between workers
+SECRET = getenv('SESSION_SECRET', '').encode('utf-8') or os.urandom(32)
+# lifetime of the tokens when SESSION_DURATION is not set: every token
+# expires, so every revocation is pruned eventually
+MAX_AGE = max(int(getenv('SESSION_TOKEN_MAX_AGE', 86400)), 1)
+REVOCATIONS = RevocationList(
+    getenv('SESSION_REVOCATION_LOG') or None,
+    float(getenv('SESSION_REVOCATION_PRUNE_INTERVAL', 60)))
+
+
+class SessionTokenAuth(SessionAuth):
+    """Stateless session authentication with signed tokens
+
+    The session cookie is `<payload>.<signature>`: the payload holds the
+    user ID, the login time, the expiry time (`SESSION_DURATION` seconds
+    after the login, `SESSION_TOKEN_MAX_AGE` if it is not set) and a random
+    token ID, and the signature
+    is its HMAC-SHA256 under `SESSION_SECRET`. Checking a session needs no
+    store: only logouts are kept, in `REVOCATIONS`, until the token expires
+    (shared by the processes writing to `SESSION_REVOCATION_LOG`). Logging
+    a user out everywhere revokes their tokens issued until then.
+    `SESSION_MAX_PER_USER` does not apply: tokens are not counted.
+    """
+
+    def __init__(self):
+        """Initializes the `SessionTokenAuth` object by setting the
+        session duration based on the environment variable
+        'SESSION_DURATION', or 'SESSION_TOKEN_MAX_AGE' if not set, and
+        warns when 'SESSION_SECRET' is not set.
+
+        Returns:
+            None
+        """
+        try:
+            self.session_duration = int(getenv('SESSION_DURATION'))
+        except Exception:
+            self.session_duration = 0
+        if self.session_duration <= 0:
+            self.session_duration = MAX_AGE
+        if not getenv('SESSION_SECRET'):
+            warnings.warn("SESSION_SECRET is not set: session tokens are "
+                          "signed with a random key and only valid in this "
+                          "process", RuntimeWarning)
+
+    @staticmethod
+    def sign(payload: bytes) -> str:
+        """Returns the signature of a payload.
+
+        Args:
+            payload (bytes): The encoded payload.
+
+        Returns:
+            str: The URL-safe base64 HMAC-SHA256 of the payload.
+        """
+        digest = hmac.new(SECRET, payload, hashlib.sha256).digest()
+        return base64.urlsafe_b64encode(digest).decode('ascii').rstrip('=')
+
+    def create_session(self, user_id: str = None) -> str:
+        """Creates a signed session token for the given user ID.
+
+        Args:
+            user_id (str): The ID of the user.
+
+        Returns:
+            str: The session token.
+        """
+        if user_id is None or not isinstance(user_id, str):
+            return None
+
+        issued_at = time.time()
+        expires_at = int(issued_at) + self.session_duration
+        payload = base64.urlsafe_b64encode("{}|{!r}|{}|{}".format(
+            user_id, issued_at, expires_at,
+            secrets.token_urlsafe(12)).encode('utf-8'))
+        return "{}.{}".format(payload.decode('ascii'), self.sign(payload))
+
+    def verify_token(self,
+                     token: str) -> Optional[Tuple[str, float, int, str]]:
+        """Checks the signature and expiry of a session token.
+
+        Args:
+            token (str): The session token.
+
+        Returns:
+            tuple: `(user ID, login time, expiry time, token ID)` of a
+            valid token, None otherwise.
+        """
+        payload, _, signature = token.encode('ascii', 'replace') \
+            .partition(b'.')
+        if not hmac.compare_digest(self.sign(payload).encode('ascii'),
+                                   signature):
+            return None
+        try:
+            user_id, issued_at, expires_at, token_id = \
+                base64.urlsafe_b64decode(payload).decode('utf-8') \
+                .rsplit('|', 3)
+            issued_at, expires_at = float(issued_at), int(expires_at)
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            return None
+        if expires_at < time.time():
+            return None
+        return user_id, issued_at, expires_at, token_id
+
+    def is_revoked(self, token: Tuple[str, float, int, str]) -> bool:
+        """Checks whether a verified token was revoked.
+
+        Args:
+            token (tuple): The verified token.
+
+        Returns:
+            bool: True if the token, or every session of its user since
+            it was issued, was revoked.
+        """
+        user_id, issued_at, _, token_id = token
+        if REVOCATIONS.is_revoked(token_id):
+            return True
+        revoked_at = REVOCATIONS.revoked_at("user:{}".format(user_id))
+        return revoked_at is not None and issued_at <= revoked_at
+
+    def user_id_for_session_id(self, session_id: str = None) -> str:
+        """Retrieves the user ID of a valid, unrevoked session token.
+
+        Args:
+            session_id (str): The session token.
+
+        Returns:
+            str: The user ID, or None if the token is invalid, expired or
+            revoked.
+        """
+        if session_id is None or not isinstance(session_id, str):
+            return None
+
+        token = self.verify_token(session_id)
+        if token is None or self.is_revoked(token):
+            return None
+        return token[0]
+
+    def delete_session(self, session_id: str) -> bool:
+        """Revokes a session token until it expires.
+
+        Args:
+            session_id (str): The session token.
+
+        Returns:
+            bool: True if the token was valid and unrevoked.
+        """
+        token = self.verify_token(session_id)
+        if token is None or self.is_revoked(token):
+            return False
+        REVOCATIONS.revoke(token[3], token[2])
+        return True
+
+    def destroy_all_sessions(self, user_id: str) -> int:
+        """Revokes every token issued to a user until now.
+
+        Args:
+            user_id (str): The ID of the user.
+
+        Returns:
+            int: 0, the tokens of a user are not counted.
+        """
+        expires_at = int(time.time()) + self.session_duration + 1
+        REVOCATIONS.revoke("user:{}".format(user_id), expires_at)
+        return 0
+
+    def session_metrics(self) -> dict:
+        """Returns the revocation list counters.
+
+        Returns:
+            dict: Tokens `revoked` and not expired yet, and revocations
+            `pruned` since startup.
+        """
+        return REVOCATIONS.metrics()
@@ -3,10 +3,12 @@
 """
 from flask import abort
 from flask import jsonify, abort
+from api.v1.auth.auth import auth_exempt
 from api.v1.views import app_views
 
 
 @app_views.route('/status', methods=['GET'], strict_slashes=False)
+@auth_exempt
 def status() -> str:
     """ GET /api/v1/status
     Return:
@@ -19,16 +21,23 @@ def status() -> str:
 def stats() -> str:
     """ GET /api/v1/stats
     Return:
-      - the number of each objects
+      - the number of each objects, the session counters of expiring
+        session auths and the queue counters of the password hashing pool
     """
+    from api.v1.app import auth
+    from models import hashers
     from models.user import User
     stats = {}
     stats['users'] = User.count()
+    if hasattr(auth, 'session_metrics'):
+        stats['sessions'] = auth.session_metrics()
+    stats['hashing'] = hashers.POOL.metrics()
     return jsonify(stats)
 
 
 # unauthorized access
 @app_views.route('/unauthorized', methods=['GET'], strict_slashes=False)
+@auth_exempt
 def unauthorized() -> str:
     """
     Route handler for unauthorized access.
@@ -42,6 +51,7 @@ def unauthorized() -> str:
 
 
 @app_views.route('/forbidden', methods=['GET'], strict_slashes=False)
+@auth_exempt
 def forbidden() -> str:
     """
     Route handler for forbidden access.
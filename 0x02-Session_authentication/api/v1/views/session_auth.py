@@ -5,6 +5,8 @@ Module of Session Auth
 This module contains the implementation of session-based authentication endpoints.
 """
 
+from api.v1.auth.auth import auth_exempt
+from api.v1.auth.context import current_user
 from api.v1.views import app_views
 from flask import abort, jsonify, request
 from models.user import User
@@ -41,8 +43,33 @@ def session_logout() -> str:
     return jsonify({}), 200
 
 
+@app_views.route('/auth_session/logout_all',
+                 methods=['DELETE'], strict_slashes=False)
+def session_logout_all() -> str:
+    """
+    Logout a user everywhere
+
+    This endpoint deletes every session of the authenticated user by
+    sending a DELETE request to '/api/v1/auth_session/logout_all'.
+
+    Returns:
+        - Empty JSON response
+
+    Raises:
+        404 error if the authentication has no sessions
+    """
+    from api.v1.app import auth
+
+    if not hasattr(auth, 'destroy_all_sessions'):
+        abort(404)
+    auth.destroy_all_sessions(current_user().id)
+
+    return jsonify({}), 200
+
+
 @app_views.route('/auth_session/login',
                  methods=['POST'], strict_slashes=False)
+@auth_exempt
 def session_login() -> str:
     """ 
     Login a user with session authentication
@@ -1,32 +1,104 @@
 #!/usr/bin/env python3
 """ Module of Users views
 """
+from api.v1.auth.context import current_user
 from api.v1.views import app_views
 from flask import abort, jsonify, request
+from models import hashers
 from models.user import User
 
 
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+MAX_BATCH_SIZE = 10000
+# with a slow password hasher, a batch takes a hashing time per user
+MAX_SLOW_BATCH_SIZE = 100
+
+
 @app_views.route('/users', methods=['GET'], strict_slashes=False)
 def view_all_users() -> str:
     """ GET /api/v1/users
+    Query parameters (optional):
+      - limit: page size (1 to 1000, 100 by default if cursor is given)
+      - cursor: next_cursor of the previous page
+      - order_by: attribute, or comma separated attributes, each prefixed
+        by `-` for descending order (only `id` with limit or cursor, pages
+        are by ID)
+      - any other: filter `attribute` or `attribute__operator`, with the
+        operators of `models.query` (`in` takes comma separated values),
+        e.g. `email__startswith=bob` or `created_at__gte=2017-10-16`;
+        parameters starting with `_` are ignored
     Return:
-      - list of all User objects JSON represented
+      - list of all matching User objects JSON represented, or with
+        limit/cursor: { "users": [ ... ], "next_cursor": ID of the last
+        user or null } with users ordered by ID
+      - 400 if a parameter is not valid
     """
-    all_users = [user.to_json() for user in User.all()]
-    return jsonify(all_users)
+    args = request.args.to_dict()
+    limit = args.pop('limit', None)
+    cursor = args.pop('cursor', None)
+    order_by = args.pop('order_by', None)
+    filters = {}
+    for key, value in args.items():
+        # private attributes can't be filtered on; `_`-prefixed parameters
+        # such as cache busters (`?_=<timestamp>`) are ignored
+        if key.startswith('_'):
+            continue
+        filters[key] = value.split(',') if key.endswith('__in') else value
+    if order_by is not None:
+        order_by = order_by.split(',')
+        for name in order_by:
+            if name.lstrip('-').startswith('_'):
+                return jsonify({'error': "unknown attribute '{}'"
+                                .format(name.lstrip('-'))}), 400
+
+    if limit is None and cursor is None:
+        try:
+            users = User.query(filters, order_by)
+        except (AttributeError, ValueError) as e:
+            return jsonify({'error': str(e)}), 400
+        return jsonify([user.to_json() for user in users])
+
+    try:
+        limit = PAGE_SIZE if limit is None else int(limit)
+    except ValueError:
+        limit = 0
+    if limit < 1 or limit > MAX_PAGE_SIZE:
+        return jsonify({'error': "limit must be between 1 and {}"
+                        .format(MAX_PAGE_SIZE)}), 400
+    if order_by not in (None, ['id']):
+        return jsonify({'error': "order_by can't be used with limit or "
+                        "cursor"}), 400
+    if not filters:
+        users = User.page(cursor or None, limit + 1)
+    else:
+        if cursor:
+            filters['id__gt'] = cursor
+        try:
+            users = User.query(filters, 'id', limit + 1)
+        except (AttributeError, ValueError) as e:
+            return jsonify({'error': str(e)}), 400
+    next_cursor = users[limit - 1].id if len(users) > limit else None
+    return jsonify({'users': [user.to_json() for user in users[:limit]],
+                    'next_cursor': next_cursor})
 
 
 @app_views.route('/users/<user_id>', methods=['GET'], strict_slashes=False)
 def view_one_user(user_id: str = None) -> str:
     """ GET /api/v1/users/:id
     Path parameter:
-      - User ID
+      - User ID, or `me` for the authenticated user
     Return:
       - User object JSON represented
       - 404 if the User ID doesn't exist
     """
     if user_id is None:
         abort(404)
+    if user_id == 'me':
+        user = current_user()
+        if user is None:
+            abort(404)
+        return jsonify(user.to_json())
     user = User.get(user_id)
     if user is None:
         abort(404)
@@ -51,6 +123,30 @@ def delete_user(user_id: str = None) -> str:
     return jsonify({}), 200
 
 
+def user_from_json(rj: dict, with_password: bool = True) -> tuple:
+    """ Build an unsaved User from a JSON body, without hashing its
+    password unless `with_password`
+    Return:
+      - (User, None), or (None, error message) if it can't be created
+    """
+    if not isinstance(rj, dict):
+        return None, "Wrong format"
+    if rj.get("email", "") == "":
+        return None, "email missing"
+    if rj.get("password", "") == "":
+        return None, "password missing"
+    try:
+        user = User()
+        user.email = rj.get("email")
+        if with_password:
+            user.password = rj.get("password")
+        user.first_name = rj.get("first_name")
+        user.last_name = rj.get("last_name")
+    except Exception as e:
+        return None, "Can't create User: {}".format(e)
+    return user, None
+
+
 @app_views.route('/users', methods=['POST'], strict_slashes=False)
 def create_user() -> str:
     """ POST /api/v1/users/
@@ -64,24 +160,13 @@ def create_user() -> str:
       - 400 if can't create the new User
     """
     rj = None
-    error_msg = None
     try:
         rj = request.get_json()
     except Exception as e:
         rj = None
-    if rj is None:
-        error_msg = "Wrong format"
-    if error_msg is None and rj.get("email", "") == "":
-        error_msg = "email missing"
-    if error_msg is None and rj.get("password", "") == "":
-        error_msg = "password missing"
+    user, error_msg = user_from_json(rj)
     if error_msg is None:
         try:
-            user = User()
-            user.email = rj.get("email")
-            user.password = rj.get("password")
-            user.first_name = rj.get("first_name")
-            user.last_name = rj.get("last_name")
             user.save()
             return jsonify(user.to_json()), 201
         except Exception as e:
@@ -89,6 +174,51 @@ def create_user() -> str:
     return jsonify({'error': error_msg}), 400
 
 
+@app_views.route('/users/batch', methods=['POST'], strict_slashes=False)
+def create_users() -> str:
+    """ POST /api/v1/users/batch
+    JSON body:
+      - list of users, as for POST /api/v1/users (at most 10000, or 100
+        with a slow password hasher); passwords are hashed concurrently
+    Return:
+      - list of results, in the order of the body: { "status": 201,
+        "user": User object JSON represented } or { "status": 400,
+        "error": message }; the valid users are saved together
+      - 400 if the body is not a list or the users can't be saved
+    """
+    rj = None
+    try:
+        rj = request.get_json()
+    except Exception as e:
+        rj = None
+    if not isinstance(rj, list):
+        return jsonify({'error': "Wrong format"}), 400
+    max_size = MAX_SLOW_BATCH_SIZE if hashers.DEFAULT.slow \
+        else MAX_BATCH_SIZE
+    if len(rj) > max_size:
+        return jsonify({'error': "at most {} users per batch"
+                        .format(max_size)}), 400
+    results = []
+    users = []
+    passwords = []
+    for item in rj:
+        user, error_msg = user_from_json(item, with_password=False)
+        if error_msg is None:
+            users.append(user)
+            passwords.append(item.get("password"))
+            results.append(user)
+        else:
+            results.append({'status': 400, 'error': error_msg})
+    try:
+        User.set_passwords(users, passwords)
+        User.save_many(users)
+    except Exception as e:
+        return jsonify({'error': "Can't create Users: {}".format(e)}), 400
+    return jsonify([{'status': 201, 'user': result.to_json()}
+                    if isinstance(result, User) else result
+                    for result in results]), 200
+
+
 @app_views.route('/users/<user_id>', methods=['PUT'], strict_slashes=False)
 def update_user(user_id: str = None) -> str:
     """ PUT /api/v1/users/:id
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+""" Benchmark of the authentication pipeline
+
+Measures `Auth.require_auth`, `BasicAuth.current_user` (credential cache
+hit and full verification), `SessionAuth`/`SessionExpAuth.current_user`
+and complete requests through the Flask test client, over synthetic user
+stores of each size given. Stores are built in a temporary directory.
+Run from the project directory:
+
+    python3 -m benchmarks.bench_auth --users 1000,10000,100000,1000000
+
+Prints ops/sec and latency percentiles (in microseconds) as JSON.
+"""
+from api.v1.auth.auth import Auth
+from api.v1.auth.basic_auth import BasicAuth
+from api.v1.auth.session_auth import SessionAuth
+from api.v1.auth.session_exp_auth import SessionExpAuth
+from models import hashers
+from models.user import User
+import api.v1.app
+import argparse
+import base64
+import json
+import os
+import random
+import tempfile
+import time
+
+
+PASSWORD = "benchmark-pwd"
+PATHS = ['/api/v1/status', '/api/v1/users', '/api/v1/users/me',
+         '/api/v1/auth_session/login/', '/api/v1/stats']
+
+
+class FakeRequest():
+    """ The parts of a Flask request the auth classes read
+    """
+
+    def __init__(self, headers: dict = {}, cookies: dict = {}):
+        """ Initialize a FakeRequest
+        """
+        self.headers = headers
+        self.cookies = cookies
+
+
+def basic_header(email: str) -> dict:
+    """ Return the Basic Authorization header of a synthetic user
+    """
+    credentials = "{}:{}".format(email, PASSWORD).encode('utf-8')
+    return {'Authorization':
+            "Basic " + base64.b64encode(credentials).decode('ascii')}
+
+
+def get_me(client, headers: dict):
+    """ GET /api/v1/users/me, failing unless the request is authorized
+    """
+    response = client.get('/api/v1/users/me', headers=headers)
+    if response.status_code != 200:
+        raise RuntimeError("GET /api/v1/users/me returned {}"
+                           .format(response.status_code))
+
+
+def populate(count: int) -> list:
+    """ Fill an empty store with `count` users sharing one password
+    """
+    User.load_from_file()
+    password_hash = hashers.encode(PASSWORD)
+    users = []
+    for i in range(count):
+        user = User()
+        user.email = "user{}@bench.io".format(i)
+        user._password = password_hash
+        users.append(user)
+    User.save_many(users)
+    return users
+
+
+def measure(operation, iterations: int) -> dict:
+    """ Time `iterations` calls of `operation(i)`
+    """
+    samples = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        operation(i)
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+
+    def percentile(q: float) -> float:
+        return samples[int(q * (len(samples) - 1))] * 1e6
+
+    return {
+        'ops_per_sec': len(samples) / sum(samples),
+        'p50_us': percentile(0.50),
+        'p95_us': percentile(0.95),
+        'p99_us': percentile(0.99),
+    }
+
+
+def bench_store(users: list, iterations: int) -> dict:
+    """ Run every case against the current store
+    """
+    results = {}
+    picks = [random.choice(users) for _ in range(iterations)]
+    excluded = api.v1.app.EXCLUDED_PATHS
+
+    auth = Auth()
+    results['require_auth'] = measure(
+        lambda i: auth.require_auth(PATHS[i % len(PATHS)], excluded),
+        iterations)
+
+    basic = BasicAuth()
+    requests = [FakeRequest(basic_header(user.email)) for user in picks]
+    BasicAuth.verified.clear()
+    results['basic_auth_verify'] = measure(
+        lambda i: (BasicAuth.verified.clear(),
+                   basic.current_user(requests[i])), iterations)
+    results['basic_auth_cached'] = measure(
+        lambda i: basic.current_user(requests[i]), iterations)
+
+    cookie = os.environ['SESSION_NAME']
+    SessionAuth.user_id_by_session_id.clear()
+    for name, klass in (('session_auth', SessionAuth),
+                        ('session_exp_auth', SessionExpAuth)):
+        session = klass()
+        requests = [FakeRequest(cookies={
+            cookie: session.create_session(user.id)}) for user in picks]
+        results[name] = measure(
+            lambda i: session.current_user(requests[i]), iterations)
+
+    # cookies are passed as a Cookie header, set_cookie() has a different
+    # signature in each Werkzeug version and a cookie jar would replace it
+    client = api.v1.app.app.test_client(use_cookies=False)
+    headers = [basic_header(user.email) for user in picks]
+    api.v1.app.auth = BasicAuth()
+    results['flask_basic_auth'] = measure(
+        lambda i: get_me(client, headers[i]), iterations)
+    session = SessionExpAuth()
+    api.v1.app.auth = session
+    headers = [{'Cookie': "{}={}".format(
+        cookie, session.create_session(user.id))} for user in picks]
+    results['flask_session_exp_auth'] = measure(
+        lambda i: get_me(client, headers[i]), iterations)
+    return results
+
+
+def main():
+    """ Entry point
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--users', default="1000,10000,100000,1000000",
+                        help="comma separated store sizes")
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    os.environ.setdefault('SESSION_NAME', '_my_session_id')
+    os.environ.setdefault('SESSION_DURATION', '3600')
+    results = {'iterations': args.iterations,
+               'hasher': hashers.DEFAULT.algorithm, 'users': {}}
+    cwd = os.getcwd()
+    try:
+        for count in (int(size) for size in args.users.split(',')):
+            with tempfile.TemporaryDirectory() as directory:
+                os.chdir(directory)
+                users = populate(count)
+                results['users'][count] = bench_store(users,
+                                                      args.iterations)
+                os.chdir(cwd)
+    finally:
+        os.chdir(cwd)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+""" Memory and serialization benchmark of the model classes
+
+Compares `models.user.User` with a copy of the previous `__dict__`-backed
+implementation. Run from the project directory:
+
+    python3 -m benchmarks.bench_models --count 100000
+"""
+from datetime import datetime
+from models.base import TIMESTAMP_FORMAT
+from models.user import User
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+import uuid
+
+
+class LegacyUser():
+    """ User as stored before the models were slotted
+    """
+
+    def __init__(self, *args: list, **kwargs: dict):
+        """ Initialize a LegacyUser instance
+        """
+        self.id = kwargs.get('id', str(uuid.uuid4()))
+        self.created_at = datetime.strptime(kwargs.get('created_at'),
+                                            TIMESTAMP_FORMAT)
+        self.updated_at = datetime.strptime(kwargs.get('updated_at'),
+                                            TIMESTAMP_FORMAT)
+        self.email = kwargs.get('email')
+        self._password = kwargs.get('_password')
+        self.first_name = kwargs.get('first_name')
+        self.last_name = kwargs.get('last_name')
+
+    def to_json(self, for_serialization: bool = False) -> dict:
+        """ Convert the object a JSON dictionary
+        """
+        result = {}
+        for key, value in self.__dict__.items():
+            if not for_serialization and key[0] == '_':
+                continue
+            if type(value) is datetime:
+                result[key] = value.strftime(TIMESTAMP_FORMAT)
+            else:
+                result[key] = value
+        return result
+
+
+def synthetic_users(count: int) -> list:
+    """ Return `count` user records as found in `.db_User.json`
+    """
+    now = datetime.utcnow().strftime(TIMESTAMP_FORMAT)
+    return [{
+        'id': str(uuid.uuid4()),
+        'created_at': now,
+        'updated_at': now,
+        'email': "user{}@hbtn.io".format(i),
+        '_password': "{:064x}".format(i),
+        'first_name': "First{}".format(i),
+        'last_name': None,
+    } for i in range(count)]
+
+
+def measure(klass, records: list) -> dict:
+    """ Measure memory and serialization throughput of `klass`
+    """
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objs = [klass(**record) for record in records]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    public = [obj.to_json() for obj in objs]
+    list_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    json.dumps({obj.id: obj.to_json(True) for obj in objs})
+    dump_time = time.perf_counter() - start
+
+    return {
+        'bytes_per_object': (after - before) / len(objs),
+        'to_json_per_sec': len(public) / list_time,
+        'snapshot_per_sec': len(objs) / dump_time,
+    }
+
+
+def main():
+    """ Entry point
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--count', type=int, default=100000)
+    args = parser.parse_args()
+
+    records = synthetic_users(args.count)
+    results = {
+        'count': args.count,
+        'legacy': measure(LegacyUser, records),
+        'slotted': measure(User, records),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+""" Memory benchmark of the SessionExpAuth session stores
+
+Creates sessions through `SessionExpAuth` with the default dict store and
+with the compact `SessionTable` (`SESSION_STORE=compact`), and reports the
+memory held per session (store, expiry heap and per-user index included)
+along with create and lookup throughput. Run from the project directory:
+
+    python3 -m benchmarks.bench_sessions --count 1000000
+"""
+from api.v1.auth.expiry import ExpiryHeap
+from api.v1.auth.session_auth import SessionAuth
+from api.v1.auth.session_exp_auth import SessionExpAuth
+from api.v1.auth.session_table import SessionTable
+import argparse
+import gc
+import itertools
+import json
+import os
+import random
+import time
+import tracemalloc
+import uuid
+
+
+STORES = {'dict': dict, 'compact': SessionTable}
+
+
+def new_auth(store_class: type) -> SessionExpAuth:
+    """ Return a SessionExpAuth on a new, empty store
+    """
+    store = store_class()
+    SessionAuth.user_id_by_session_id = store
+    SessionAuth.session_ids_by_user_id = {}
+    SessionAuth.indexed = not hasattr(store, 'session_ids')
+    SessionExpAuth.expiry = ExpiryHeap()
+    return SessionExpAuth()
+
+
+def create(auth: SessionExpAuth, user_ids: list, count: int):
+    """ Create `count` sessions spread over `user_ids`
+    """
+    users = len(user_ids)
+    for i in range(count):
+        auth.create_session(user_ids[i % users])
+
+
+def measure(store_class: type, user_ids: list, count: int,
+            lookups: int) -> dict:
+    """ Measure the memory and throughput of one store
+    """
+    auth = new_auth(store_class)
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    create(auth, user_ids, count)
+    gc.collect()
+    memory = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    auth = new_auth(store_class)
+    gc.collect()
+    start = time.perf_counter()
+    create(auth, user_ids, count)
+    create_time = time.perf_counter() - start
+    session_ids = list(itertools.islice(iter(auth.user_id_by_session_id),
+                                        lookups))
+    random.shuffle(session_ids)
+    start = time.perf_counter()
+    for session_id in session_ids:
+        auth.user_id_for_session_id(session_id)
+    lookup_time = time.perf_counter() - start
+    return {
+        'bytes_per_session': memory / count,
+        'create_per_sec': count / create_time,
+        'lookup_per_sec': len(session_ids) / lookup_time,
+    }
+
+
+def main():
+    """ Entry point
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--count', type=int, default=1000000)
+    parser.add_argument('--sessions-per-user', type=int, default=2)
+    parser.add_argument('--lookups', type=int, default=100000)
+    args = parser.parse_args()
+
+    os.environ.setdefault('SESSION_DURATION', '3600')
+    random.seed(0)
+    user_ids = [str(uuid.uuid4()) for _ in range(
+        max(args.count // args.sessions_per_user, 1))]
+    results = {'count': args.count,
+               'sessions_per_user': args.sessions_per_user}
+    for name, store_class in STORES.items():
+        results[name] = measure(store_class, user_ids, args.count,
+                                args.lookups)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+""" Load benchmark of the timestamp codec
+
+Loads synthetic users the way `User.load_from_file()` does (one object per
+JSON record) and writes them back with `to_json(True)`, comparing the
+previous `strptime`/`strftime` implementation with the lazy codec of
+`models/timestamp.py`, from ISO strings and from epoch seconds. Each lazy
+case writes timestamps in the format it loads (as with `DB_TIMESTAMP` set
+accordingly), whatever `DB_TIMESTAMP` is. Run from the project directory:
+
+    python3 -m benchmarks.bench_timestamps --count 1000000
+"""
+from benchmarks.bench_models import LegacyUser, synthetic_users
+from models.timestamp import to_epoch, to_iso
+from models.user import User
+import argparse
+import models.base
+import gc
+import json
+import time
+
+
+def timed(function, *args) -> tuple:
+    """ Return the result of `function(*args)` and the seconds it took
+    """
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        result = function(*args)
+        return result, time.perf_counter() - start
+    finally:
+        gc.enable()
+
+
+def measure(klass, records: list, encoder=None) -> dict:
+    """ Measure load, dump and first-read throughput of `klass`, the
+    lazy codec writing timestamps with `encoder`
+    """
+    if encoder is not None:
+        # serializers capture the encoder when they are built
+        models.base.encode = encoder
+        models.base.SERIALIZERS.clear()
+    count = len(records)
+    objs, load_time = timed(lambda: [klass(**record) for record in records])
+    _, dump_time = timed(lambda: [obj.to_json(True) for obj in objs])
+    _, read_time = timed(lambda: [obj.created_at for obj in objs])
+    return {
+        'load_per_sec': count / load_time,
+        'dump_per_sec': count / dump_time,
+        'first_read_per_sec': count / read_time,
+    }
+
+
+def main():
+    """ Entry point
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--count', type=int, default=1000000)
+    args = parser.parse_args()
+
+    records = synthetic_users(args.count)
+    results = {'count': args.count}
+    results['legacy'] = measure(LegacyUser, records)
+    encode = models.base.encode
+    try:
+        results['lazy_iso'] = measure(User, records, to_iso)
+        for record in records:
+            record['created_at'] = to_epoch(record['created_at'])
+            record['updated_at'] = to_epoch(record['updated_at'])
+        results['lazy_epoch'] = measure(User, records, to_epoch)
+    finally:
+        models.base.encode = encode
+        models.base.SERIALIZERS.clear()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+""" Main 5: several processes writing the same shared User files
+"""
+import multiprocessing
+import os
+import tempfile
+
+""" Shared files, journal compacted every few writes """
+os.environ['DB_MULTIPROCESS'] = '1'
+os.environ['DB_JOURNAL_MAX_BYTES'] = '16384'
+os.chdir(tempfile.mkdtemp())
+
+WORKERS = 4
+USERS_PER_WORKER = 200
+
+
+def write(worker: int, results: multiprocessing.Queue):
+    """ Create users, update and remove some, return the expected state
+    """
+    from models.user import User
+
+    expected = {}
+    for i in range(USERS_PER_WORKER):
+        user = User()
+        user.email = "worker{}_{}@hbtn.io".format(worker, i)
+        user.save()
+        expected[user.id] = user.email
+        if i % 5 == 4:
+            user.remove()
+            del expected[user.id]
+        elif i % 5 == 3:
+            user.first_name = "Bob"
+            user.save()
+            expected[user.id] = user.email
+    """ Every write of the other workers is visible too """
+    others = sum(1 for user in User.all()
+                 if not user.email.startswith("worker{}_".format(worker)))
+    results.put((worker, expected, others))
+
+
+if __name__ == "__main__":
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    processes = [context.Process(target=write, args=(worker, results))
+                 for worker in range(WORKERS)]
+    for process in processes:
+        process.start()
+    expected = {}
+    for _ in processes:
+        worker, worker_expected, others = results.get()
+        print("Worker {}: {} users, saw {} users of the others at the end"
+              .format(worker, len(worker_expected), others))
+        expected.update(worker_expected)
+    for process in processes:
+        process.join()
+
+    """ A fresh load finds exactly the users left by all the workers """
+    from models.user import User
+
+    User.load_from_file()
+    stored = {user.id: user.email for user in User.all()}
+    print("Expected {} users, stored {}".format(len(expected), len(stored)))
+    print("OK" if stored == expected else "MISMATCH")
+    updated = [user for user in User.all()
+               if int(user.email.split('_')[1].split('@')[0]) % 5 == 3]
+    print("Updates kept: {}".format(
+        all(user.first_name == "Bob" for user in updated)))
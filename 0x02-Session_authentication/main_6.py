@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+""" Main 6: random operations on a SessionTable and on a dict
+"""
+from api.v1.auth.session_table import SessionTable
+from collections import OrderedDict
+from datetime import datetime
+import random
+import uuid
+
+random.seed(6)
+table = SessionTable()
+sessions = {}
+by_user = {}
+user_ids = [str(uuid.uuid4()) for _ in range(50)]
+session_ids = [str(uuid.uuid4()) for _ in range(2000)]
+
+
+def expected_ids(user_id: str) -> list:
+    """ Session IDs of a user in the dict, least recently used first
+    (a session set again for the same user keeps its place)
+    """
+    return list(by_user.get(user_id, ()))
+
+
+def forget(session_id: str):
+    """ Remove a session from the dict
+    """
+    value = sessions.pop(session_id)
+    user_id = value['user_id'] if isinstance(value, dict) else value
+    del by_user[user_id][session_id]
+    if not by_user[user_id]:
+        del by_user[user_id]
+
+
+""" Same operations on both, compared after each one """
+errors = 0
+for step in range(50000):
+    operation = random.random()
+    session_id = random.choice(session_ids)
+    if operation < 0.4:
+        user_id = random.choice(user_ids)
+        if random.random() < 0.5:
+            value = user_id
+        else:
+            value = {'user_id': user_id,
+                     'created_at': datetime.fromtimestamp(
+                         random.randint(1500000000, 1800000000))}
+        previous = sessions.get(session_id)
+        if isinstance(previous, dict):
+            previous = previous['user_id']
+        if previous is not None and previous != user_id:
+            forget(session_id)
+        sessions[session_id] = value
+        by_user.setdefault(user_id, OrderedDict())[session_id] = None
+        table[session_id] = value
+    elif operation < 0.6:
+        if session_id in sessions:
+            forget(session_id)
+            table.pop(session_id)
+        elif table.pop(session_id, None) is not None:
+            errors += 1
+    elif operation < 0.7:
+        value = sessions.get(session_id)
+        if value is not None:
+            user_id = value['user_id'] if isinstance(value, dict) else value
+            by_user[user_id].move_to_end(session_id)
+        table.touch(session_id)
+    else:
+        if table.get(session_id) != sessions.get(session_id):
+            errors += 1
+    user_id = random.choice(user_ids)
+    if table.session_ids(user_id) != expected_ids(user_id):
+        errors += 1
+    if len(table) != len(sessions):
+        errors += 1
+
+""" Full comparison """
+if sorted(table) != sorted(sessions) or \
+        any(table[session_id] != value
+            for session_id, value in sessions.items()):
+    errors += 1
+cutoff = 1650000000
+expired = sorted(session_id for session_id, _ in table.scan(cutoff))
+if expired != sorted(session_id for session_id, value in sessions.items()
+                     if isinstance(value, dict) and
+                     value['created_at'].timestamp() <= cutoff):
+    errors += 1
+
+print("{} sessions, {} users".format(len(table), len(by_user)))
+print("{} bytes in the table".format(table.memory()))
+print("OK" if errors == 0 else "{} mismatches".format(errors))
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+""" Atomic file replacement module
+"""
+from contextlib import contextmanager
+from typing import IO, Iterator
+from os import path
+import os
+import tempfile
+
+
+@contextmanager
+def atomic_write(file_path: str, mode: str = 'w') -> Iterator[IO]:
+    """ Open a temporary file next to `file_path` for writing, and move it
+    over `file_path` once written and synced
+
+    Readers see either the previous content or the new one, never a
+    partially written file; on error the previous content is left as is.
+    """
+    fd, tmp_path = tempfile.mkstemp(
+        dir=path.dirname(path.abspath(file_path)),
+        prefix="{}.".format(path.basename(file_path)), suffix='.tmp')
+    try:
+        os.chmod(tmp_path, os.stat(file_path).st_mode & 0o777
+                 if path.exists(file_path) else 0o644)
+        with os.fdopen(fd, mode) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
@@ -2,38 +2,57 @@
 """ Base module
 """
 from datetime import datetime
-from typing import TypeVar, List, Iterable
-from os import path
-import json
+from typing import TypeVar, List, Iterable, Iterator, Optional, Union
+from os import getenv
+from models import storage
+from models.engine.file_storage import DATA
+from models.query import Query
+from models.timestamp import Timestamp, encode, to_iso
+import operator
 import uuid
 
 
 TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
-DATA = {}
+SERIALIZERS = {}
+STATES = {}
 
 
 class Base():
     """ Base class
+
+    Persistence goes through `models.storage` (see `models/engine/`).
+    Subclasses list in `_indexes` the attributes worth indexing for
+    equality lookups; `_journaled`, `_write_behind`, `_snapshot_format`,
+    `_shared` and `_shards` configure the file storage.
+
+    Attributes live in `__slots__`: each subclass declares its own, and
+    `to_json()` goes through a serializer compiled once per class.
+    Timestamps keep their stored value until read (see `models/timestamp`).
+    Once a timestamp has been decoded (formatting it is the costly part),
+    both `to_json()` variants are cached in `_json_cache` along with the
+    attribute values they were built from, and rebuilt once those change.
     """
+    __slots__ = ('id', '_created_at', '_updated_at', '_json_cache')
+    _journaled = getenv('DB_JOURNAL', '0') == '1'
+    _write_behind = getenv('DB_WRITE_BEHIND', '0') == '1'
+    _snapshot_format = getenv('DB_SNAPSHOT', 'json')
+    _shared = getenv('DB_MULTIPROCESS', '0') == '1'
+    _shards = int(getenv('DB_SHARDS', 1))
+    _indexes = ()
+    _timestamps = ('created_at', 'updated_at')
+    created_at = Timestamp('_created_at')
+    updated_at = Timestamp('_updated_at')
 
     def __init__(self, *args: list, **kwargs: dict):
         """ Initialize a Base instance
         """
-        s_class = str(self.__class__.__name__)
-        if DATA.get(s_class) is None:
-            DATA[s_class] = {}
-
         self.id = kwargs.get('id', str(uuid.uuid4()))
-        if kwargs.get('created_at') is not None:
-            self.created_at = datetime.strptime(kwargs.get('created_at'),
-                                                TIMESTAMP_FORMAT)
-        else:
-            self.created_at = datetime.utcnow()
-        if kwargs.get('updated_at') is not None:
-            self.updated_at = datetime.strptime(kwargs.get('updated_at'),
-                                                TIMESTAMP_FORMAT)
-        else:
-            self.updated_at = datetime.utcnow()
+        created_at = kwargs.get('created_at')
+        updated_at = kwargs.get('updated_at')
+        if created_at is None or updated_at is None:
+            now = datetime.utcnow()
+        self._created_at = now if created_at is None else created_at
+        self._updated_at = now if updated_at is None else updated_at
 
     def __eq__(self, other: TypeVar('Base')) -> bool:
         """ Equality
@@ -47,66 +66,169 @@ class Base():
     def to_json(self, for_serialization: bool = False) -> dict:
         """ Convert the object a JSON dictionary
         """
-        result = {}
-        for key, value in self.__dict__.items():
-            if not for_serialization and key[0] == '_':
-                continue
+        return dict(self._cached_json(for_serialization))
+
+    def _cached_json(self, for_serialization: bool = False) -> dict:
+        """ Return the cached JSON dictionary, building it if needed
+
+        The dictionary is shared: callers must not modify it.
+        """
+        key = (self.__class__, for_serialization)
+        serializer = SERIALIZERS.get(key)
+        if serializer is None:
+            serializer = self.__class__._serializer(for_serialization)
+            SERIALIZERS[key] = serializer
+        if type(self._created_at) is not datetime and \
+                type(self._updated_at) is not datetime:
+            return serializer(self)
+        state_of = STATES.get(self.__class__)
+        if state_of is None:
+            state_of = self.__class__._state_getter()
+            STATES[self.__class__] = state_of
+        if not state_of:
+            return serializer(self)
+
+        # the values are read before serializing: if an assignment happens
+        # meanwhile, the next call sees them differ and rebuilds
+        state = state_of(self)
+        cache = getattr(self, '_json_cache', None)
+        if cache is None or cache[0] != state:
+            cache = [state, None, None]
+            self._json_cache = cache
+        result = cache[1 + for_serialization]
+        if result is None:
+            result = serializer(self)
+            cache[1 + for_serialization] = result
+        return result
+
+    @classmethod
+    def _state_getter(cls):
+        """ Return a function reading the stored values of all the fields,
+        or False for classes with a `__dict__`, which are never cached
+        """
+        if any('__slots__' not in klass.__dict__
+               for klass in cls.__mro__[:-1]):
+            return False
+        return operator.attrgetter(*[
+            '_' + field if field in cls._timestamps else field
+            for field in cls._fields()])
+
+    @classmethod
+    def _fields(cls) -> List[str]:
+        """ Return the slot names of the class, base classes first, with
+        timestamps under their attribute name
+        """
+        fields = []
+        for klass in reversed(cls.__mro__):
+            slots = klass.__dict__.get('__slots__', ())
+            if isinstance(slots, str):
+                slots = (slots,)
+            fields.extend(s[1:] if s[1:] in cls._timestamps else s
+                          for s in slots
+                          if s not in ('__dict__', '__weakref__',
+                                       '_json_cache'))
+        return fields
+
+    @classmethod
+    def _serializer(cls, for_serialization: bool):
+        """ Build the function converting an object of the class to a dict
+
+        Fully slotted classes get a single dict display compiled for their
+        fields; classes with a `__dict__` keep the generic attribute walk.
+        Timestamps are written as stored (`encode`) or as ISO strings.
+        """
+        fields = [f for f in cls._fields()
+                  if for_serialization or f[0] != '_']
+        _timestamp = encode if for_serialization else to_iso
+
+        def _format(value):
             if type(value) is datetime:
-                result[key] = value.strftime(TIMESTAMP_FORMAT)
+                return _timestamp(value)
+            return value
+
+        if any('__slots__' not in klass.__dict__
+               for klass in cls.__mro__[:-1]):
+            def _generic(obj):
+                result = {}
+                for field in fields:
+                    result[field] = _format(getattr(obj, field))
+                for field, value in obj.__dict__.items():
+                    if for_serialization or field[0] != '_':
+                        result[field] = _format(value)
+                return result
+            return _generic
+
+        items = []
+        for field in fields:
+            if field in cls._timestamps:
+                items.append("{!r}: _timestamp(obj._{})".format(field, field))
             else:
-                result[key] = value
-        return result
+                items.append("{!r}: obj.{}".format(field, field))
+        source = "def _serialize(obj):\n    return {{{}}}\n".format(
+            ", ".join(items))
+        namespace = {'_timestamp': _timestamp}
+        exec(compile(source, "<{} serializer>".format(cls.__name__), 'exec'),
+             namespace)
+        return namespace['_serialize']
 
     @classmethod
     def load_from_file(cls):
         """ Load all objects from file
         """
-        s_class = cls.__name__
-        file_path = ".db_{}.json".format(s_class)
-        DATA[s_class] = {}
-        if not path.exists(file_path):
-            return
-
-        with open(file_path, 'r') as f:
-            objs_json = json.load(f)
-            for obj_id, obj_json in objs_json.items():
-                DATA[s_class][obj_id] = cls(**obj_json)
+        storage.load(cls)
 
     @classmethod
     def save_to_file(cls):
         """ Save all objects to file
         """
-        s_class = cls.__name__
-        file_path = ".db_{}.json".format(s_class)
-        objs_json = {}
-        for obj_id, obj in DATA[s_class].items():
-            objs_json[obj_id] = obj.to_json(True)
+        storage.save_all(cls)
 
-        with open(file_path, 'w') as f:
-            json.dump(objs_json, f)
+    @classmethod
+    def flush(cls):
+        """ Write pending write-behind mutations to file
+
+        `Base.flush()` flushes every class, `User.flush()` only users.
+        """
+        storage.flush(None if cls is Base else cls)
 
     def save(self):
         """ Save current object
         """
-        s_class = self.__class__.__name__
         self.updated_at = datetime.utcnow()
-        DATA[s_class][self.id] = self
-        self.__class__.save_to_file()
+        storage.save(self)
 
     def remove(self):
         """ Remove object
         """
-        s_class = self.__class__.__name__
-        if DATA[s_class].get(self.id) is not None:
-            del DATA[s_class][self.id]
-            self.__class__.save_to_file()
+        storage.remove(self)
+
+    @classmethod
+    def save_many(cls, objs: Iterable[TypeVar('Base')]):
+        """ Save objects with one persistence pass per class
+        """
+        now = datetime.utcnow()
+        by_class = {}
+        for obj in objs:
+            obj.updated_at = now
+            by_class.setdefault(obj.__class__, []).append(obj)
+        for klass, klass_objs in by_class.items():
+            storage.save_many(klass, klass_objs)
+
+    @classmethod
+    def remove_many(cls, objs: Iterable[TypeVar('Base')]):
+        """ Remove objects with one persistence pass per class
+        """
+        by_class = {}
+        for obj in objs:
+            by_class.setdefault(obj.__class__, []).append(obj)
+        for klass, klass_objs in by_class.items():
+            storage.remove_many(klass, klass_objs)
 
     @classmethod
     def count(cls) -> int:
         """ Count all objects
         """
-        s_class = cls.__name__
-        return len(DATA[s_class].keys())
+        return storage.count(cls)
 
     @classmethod
     def all(cls) -> Iterable[TypeVar('Base')]:
@@ -118,20 +240,31 @@ class Base():
     def get(cls, id: str) -> TypeVar('Base'):
         """ Return one object by ID
         """
-        s_class = cls.__name__
-        return DATA[s_class].get(id)
+        return storage.get(cls, id)
 
     @classmethod
     def search(cls, attributes: dict = {}) -> List[TypeVar('Base')]:
         """ Search all objects with matching attributes
         """
-        s_class = cls.__name__
-        def _search(obj):
-            if len(attributes) == 0:
-                return True
-            for k, v in attributes.items():
-                if (getattr(obj, k) != v):
-                    return False
-            return True
-        
-        return list(filter(_search, DATA[s_class].values()))
+        return storage.search(cls, attributes)
+
+    @classmethod
+    def query(cls, filters: dict = {},
+              order_by: Union[str, List[str], None] = None,
+              limit: Optional[int] = None) -> List[TypeVar('Base')]:
+        """ Search objects with operators, ordering and limit (see `Query`)
+        """
+        return storage.query(cls, Query(cls, filters, order_by, limit))
+
+    @classmethod
+    def iter(cls, attributes: dict = {}) -> Iterator[TypeVar('Base')]:
+        """ Iterate over all objects with matching attributes
+        """
+        return storage.iter(cls, attributes)
+
+    @classmethod
+    def page(cls, after: Optional[str] = None,
+             limit: int = 100) -> List[TypeVar('Base')]:
+        """ Return at most `limit` objects ordered by ID, after ID `after`
+        """
+        return storage.page(cls, after, limit)
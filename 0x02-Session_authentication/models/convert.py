@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+""" Convert model files between JSON and binary snapshots
+
+    python3 -m models.convert to-binary .db_User.json .db_User.bin
+    python3 -m models.convert to-json .db_User.bin .db_User.json
+
+`to-binary` indexes the `_indexes` of the model, named by `--class` or
+taken from the source file name, unless `--index` lists other attributes.
+"""
+from models.snapshot import Snapshot, encode, write_snapshot
+from os import path
+import argparse
+import json
+import re
+
+
+def model(name: str) -> type:
+    """ Return the model class named `name`, None if there is none
+    """
+    from models.user import User
+    from models.user_session import UserSession
+    return {cls.__name__: cls for cls in (User, UserSession)}.get(name)
+
+
+def main():
+    """ Convert between `.db_<Class>.json` and `.db_<Class>.bin`
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('direction', choices=['to-binary', 'to-json'])
+    parser.add_argument('source')
+    parser.add_argument('destination')
+    parser.add_argument('--class', dest='class_name',
+                        help="model of the objects (to-binary only)")
+    parser.add_argument('--index', action='append', default=[],
+                        help="attribute to index (to-binary only)")
+    args = parser.parse_args()
+
+    if args.direction == 'to-json':
+        snapshot = Snapshot(args.source)
+        objs_json = {obj_id: json.loads(raw)
+                     for obj_id, raw in snapshot.items()}
+        with open(args.destination, 'w') as f:
+            json.dump(objs_json, f)
+        return
+
+    attributes = args.index
+    if not attributes:
+        match = re.match(r'\.db_(\w+)\.json$', path.basename(args.source))
+        class_name = args.class_name or (match and match.group(1))
+        cls = model(class_name)
+        if cls is None:
+            parser.error("unknown model '{}': pass --class or --index"
+                         .format(class_name))
+        attributes = cls._indexes
+
+    with open(args.source, 'r') as f:
+        objs_json = json.load(f)
+    index = {}
+    for attr in attributes:
+        ids_by_value = {}
+        for obj_id, obj_json in objs_json.items():
+            value = obj_json.get(attr)
+            try:
+                ids_by_value.setdefault(value, []).append(obj_id)
+            except TypeError:
+                # unhashable value: left out, like in `HashIndex`
+                continue
+        index[attr] = [[value, sorted(ids)]
+                       for value, ids in ids_by_value.items()]
+    write_snapshot(args.destination,
+                   ((obj_id, encode(obj_json))
+                    for obj_id, obj_json in objs_json.items()), index)
+
+
+if __name__ == "__main__":
+    main()
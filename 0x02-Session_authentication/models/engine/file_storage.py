@@ -0,0 +1,595 @@
+#!/usr/bin/env python3
+""" File storage module
+"""
+from contextlib import nullcontext
+from typing import ContextManager, Iterator, List, Optional, Tuple, TypeVar
+from os import getenv, path
+from models.atomic import atomic_write
+from models.engine.storage import Storage
+from models.filelock import FileLock
+from models.flusher import Flusher
+from models.index import HashIndex
+from models.journal import Journal
+from models.query import Query
+from models.rwlock import RWLock
+from models.shards import ShardMap, read_json, shard_paths
+from models.snapshot import LazyRecords, Snapshot, encode, write_snapshot
+from bisect import bisect_left, bisect_right
+from itertools import islice
+import json
+import os
+import threading
+
+
+DATA = {}
+JOURNALS = {}
+INDEXES = {}
+ORDERS = {}
+LOCKS = {}
+WRITERS = {}
+SYNC = {}
+SHARDS = {}
+STALE = {}
+JOURNAL_MAX_BYTES = int(getenv('DB_JOURNAL_MAX_BYTES', 4 * 1024 * 1024))
+FLUSHER = Flusher(int(getenv('DB_FLUSH_INTERVAL_MS', 200)) / 1000,
+                  int(getenv('DB_FLUSH_MAX_PENDING', 1000)))
+
+
+class FileStorage(Storage):
+    """ Objects kept in memory in `DATA`, persisted to `.db_<Class>.json`
+
+    By default every mutation rewrites the file of the class. Two cheaper
+    modes can be switched on per class (or globally from the environment):
+
+    - `_journaled` (`DB_JOURNAL=1`): mutations are appended to
+      `.db_<Class>.log`, which is folded back into the snapshot in the
+      background once it grows past `DB_JOURNAL_MAX_BYTES`;
+    - `_write_behind` (`DB_WRITE_BEHIND=1`): mutations only mark the class
+      dirty, and `FLUSHER` rewrites the file from a background thread.
+
+    The attributes listed in the `_indexes` of a class are kept in a hash
+    index used by `search()` for equality lookups. The ids of a class are
+    kept sorted in `ORDERS` once `page()` first needs them, so each page
+    is a binary search.
+
+    With `_shards = K` (`DB_SHARDS=K`), the JSON snapshot is split by id
+    hash into `.db_<Class>.<k>.json` files and only the shards holding
+    mutated objects are rewritten (see `models.shards`). Files of another
+    layout are read, then deleted once the new one is written.
+
+    With `_snapshot_format = 'binary'` (`DB_SNAPSHOT=binary`), snapshots
+    are written to `.db_<Class>.bin` instead, memory-mapped on load and
+    decoded object by object on first access (see `models.snapshot`).
+
+    The objects of a class are guarded by a reader/writer lock, and files
+    are replaced atomically, so the storage can be shared by threads.
+
+    With `_shared` (`DB_MULTIPROCESS=1`), several processes can share the
+    files: mutations are journaled under an exclusive `flock` on
+    `.db_<Class>.lock`, and every read first checks (with `stat`) whether
+    another process wrote since; new log records are then applied
+    incrementally, and a rewritten snapshot triggers a full reload.
+    """
+
+    def objects(self, cls: type) -> dict:
+        """ Return the `id -> object` dictionary of `cls`
+        """
+        return DATA.setdefault(cls.__name__, {})
+
+    def lock(self, cls: type) -> RWLock:
+        """ Return the reader/writer lock guarding the objects of `cls`
+        """
+        lock = LOCKS.get(cls.__name__)
+        if lock is None:
+            lock = LOCKS.setdefault(cls.__name__, RWLock())
+        return lock
+
+    def writer(self, cls: type) -> threading.Lock:
+        """ Return the lock serializing the snapshot writes of `cls`
+        """
+        lock = WRITERS.get(cls.__name__)
+        if lock is None:
+            lock = WRITERS.setdefault(cls.__name__, threading.Lock())
+        return lock
+
+    def process_lock(self, cls: type,
+                     exclusive: bool) -> ContextManager:
+        """ Return the inter-process lock of `cls` if it is shared
+        """
+        if not cls._shared:
+            return nullcontext()
+        lock = FileLock(".db_{}.lock".format(cls.__name__))
+        return lock.exclusive() if exclusive else lock.shared()
+
+    def journal(self, cls: type) -> Journal:
+        """ Return the mutation log of `cls`
+        """
+        s_class = cls.__name__
+        journal = JOURNALS.get(s_class)
+        if journal is None:
+            journal = JOURNALS.setdefault(
+                s_class, Journal(".db_{}.log".format(s_class)))
+        return journal
+
+    def index(self, cls: type) -> HashIndex:
+        """ Return the attribute index of `cls`
+        """
+        s_class = cls.__name__
+        index = INDEXES.get(s_class)
+        if index is None:
+            index = INDEXES.setdefault(s_class, HashIndex(cls._indexes))
+        return index
+
+    def shard_map(self, cls: type) -> Optional[ShardMap]:
+        """ Return the shard map of `cls`, or None if it isn't sharded
+        """
+        if cls._shards < 2 or cls._snapshot_format == 'binary':
+            return None
+        s_class = cls.__name__
+        shards = SHARDS.get(s_class)
+        if shards is None:
+            shards = SHARDS.setdefault(s_class,
+                                       ShardMap(s_class, cls._shards))
+        return shards
+
+    def snapshot_paths(self, cls: type) -> List[str]:
+        """ Return the JSON snapshot files of `cls`
+        """
+        shards = self.shard_map(cls)
+        if shards is None:
+            return [".db_{}.json".format(cls.__name__)]
+        return shards.file_paths()
+
+    def load(self, cls: type):
+        """ Load all objects from file
+        """
+        with self.process_lock(cls, False):
+            self.reload(cls)
+
+    def reload(self, cls: type):
+        """ Load all objects from file, inter-process lock held
+        """
+        with self.lock(cls).write():
+            self.load_unlocked(cls)
+            if cls._shared:
+                self.mark_synced(cls)
+
+    def load_unlocked(self, cls: type):
+        """ Load all objects from file, write lock held
+        """
+        s_class = cls.__name__
+        file_path = ".db_{}.json".format(s_class)
+        bin_path = ".db_{}.bin".format(s_class)
+        index = self.index(cls)
+        index.clear()
+        ORDERS.pop(s_class, None)
+        records = self.journal(cls).records()
+
+        if cls._snapshot_format == 'binary' and path.exists(bin_path):
+            objs = LazyRecords(Snapshot(bin_path), cls)
+            index.attach(lambda: self.index_entries(cls, objs))
+            for op, obj_id, obj_json in records:
+                self.apply(cls, objs, op, obj_id, obj_json)
+            DATA[s_class] = objs
+            return
+
+        # without files of its own layout, a class reads the other one
+        shards = self.shard_map(cls)
+        expected = self.snapshot_paths(cls)
+        legacy = [file_path] if path.exists(file_path) else []
+        if shards is None:
+            file_paths = legacy or shard_paths(s_class)
+        else:
+            file_paths = shard_paths(s_class) or legacy
+            shards.clear()
+
+        objs_json = {}
+        for part_path in file_paths:
+            part = read_json(part_path)
+            if shards is not None:
+                shards.place(part.keys(), expected.index(part_path)
+                             if part_path in expected else None)
+            objs_json.update(part)
+        STALE[s_class] = [part_path for part_path in file_paths
+                          if part_path not in expected]
+        if shards is not None and STALE[s_class]:
+            shards.mark_all()
+        for op, obj_id, obj_json in records:
+            if op == 'save':
+                objs_json[obj_id] = obj_json
+                if shards is not None:
+                    shards.add(obj_id)
+            elif op == 'remove':
+                objs_json.pop(obj_id, None)
+                if shards is not None:
+                    shards.discard(obj_id)
+        DATA[s_class] = {}
+        for obj_id, obj_json in objs_json.items():
+            obj = cls(**obj_json)
+            DATA[s_class][obj_id] = obj
+            index.add(obj)
+
+    def apply(self, cls: type, objs: dict, op: str, obj_id: str,
+              obj_json: Optional[dict]):
+        """ Apply one journal record to `objs` and the index, write lock held
+        """
+        shards = self.shard_map(cls)
+        if op == 'save':
+            obj = cls(**obj_json)
+            objs[obj_id] = obj
+            self.index(cls).add(obj)
+            self.order_add(cls, obj_id)
+            if shards is not None:
+                shards.add(obj_id)
+        elif op == 'remove' and obj_id in objs:
+            del objs[obj_id]
+            self.index(cls).discard(obj_id)
+            self.order_discard(cls, obj_id)
+            if shards is not None:
+                shards.discard(obj_id)
+
+    def sorted_ids(self, cls: type) -> List[str]:
+        """ Return the ids of `cls` in order, sorted on the first call
+        after a load (in one pass over the sorted directory of a binary
+        snapshot); lock held
+        """
+        ids = ORDERS.get(cls.__name__)
+        if ids is None:
+            ids = ORDERS.setdefault(cls.__name__, sorted(self.objects(cls)))
+        return ids
+
+    def order_add(self, cls: type, obj_id: str):
+        """ Insert an id in the sorted ids of `cls`, write lock held
+        """
+        ids = ORDERS.get(cls.__name__)
+        if ids is None:
+            return
+        i = bisect_left(ids, obj_id)
+        if i == len(ids) or ids[i] != obj_id:
+            ids.insert(i, obj_id)
+
+    def order_discard(self, cls: type, obj_id: str):
+        """ Remove an id from the sorted ids of `cls`, write lock held
+        """
+        ids = ORDERS.get(cls.__name__)
+        if ids is None:
+            return
+        i = bisect_left(ids, obj_id)
+        if i < len(ids) and ids[i] == obj_id:
+            del ids[i]
+
+    def stat_id(self, file_path: str) -> Optional[Tuple[int, int, int]]:
+        """ Return what identifies the current version of a file
+        """
+        try:
+            st = os.stat(file_path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def files_state(self, cls: type) -> Tuple:
+        """ Return `(snapshot versions, log inode, log size)` of `cls`
+        """
+        s_class = cls.__name__
+        log = self.stat_id(".db_{}.log".format(s_class))
+        snapshots = self.snapshot_paths(cls) + [".db_{}.bin".format(s_class)]
+        return (tuple(self.stat_id(file_path) for file_path in snapshots),
+                log[0] if log else None, log[2] if log else 0)
+
+    def mark_synced(self, cls: type):
+        """ Record that memory reflects the files of `cls` as they are now
+        """
+        SYNC[cls.__name__] = self.files_state(cls)
+
+    def refresh(self, cls: type, locked: bool = False):
+        """ Catch up with the writes other processes made to a shared class
+
+        `locked` tells the inter-process lock is already held.
+        """
+        if not cls._shared:
+            return
+        state = SYNC.get(cls.__name__)
+        snapshots, log_ino, log_size = self.files_state(cls)
+        if state is not None and state[0] == snapshots and \
+                (state[1] == log_ino or state[2] == 0) and \
+                log_size >= state[2]:
+            if log_size == state[2] and state[1] == log_ino:
+                return
+            with nullcontext() if locked else \
+                    self.process_lock(cls, False):
+                self.catch_up(cls)
+            return
+        if locked:
+            self.reload(cls)
+        else:
+            with self.process_lock(cls, False):
+                self.reload(cls)
+
+    def catch_up(self, cls: type):
+        """ Apply the log records written since the last sync
+        """
+        s_class = cls.__name__
+        with self.lock(cls).write():
+            snapshots, log_ino, offset = SYNC[s_class]
+            current = self.files_state(cls)
+            if current[0] != snapshots:
+                self.load_unlocked(cls)
+                self.mark_synced(cls)
+                return
+            if current[1] != log_ino:
+                offset = 0
+            records, offset = self.journal(cls).tail(offset)
+            objs = self.objects(cls)
+            for op, obj_id, obj_json in records:
+                self.apply(cls, objs, op, obj_id, obj_json)
+            SYNC[s_class] = (snapshots, current[1], offset)
+
+    def index_entries(self, cls: type, objs: LazyRecords) -> dict:
+        """ Return the index stored in the snapshot behind `objs`, or
+        rebuild it by decoding every object if it misses some attributes
+        """
+        entries = objs.snapshot.index()
+        if all(attr in entries for attr in cls._indexes):
+            return entries
+        index = HashIndex(cls._indexes)
+        for obj in objs.values():
+            index.add(obj)
+        return index.dump()
+
+    def save_all(self, cls: type):
+        """ Save all objects to file
+        """
+        journal = self.journal(cls)
+        binary = cls._snapshot_format == 'binary'
+        shards = self.shard_map(cls)
+        with self.writer(cls), self.process_lock(cls, True):
+            self.refresh(cls, locked=True)
+            objs = self.objects(cls)
+            with journal.lock, self.lock(cls).read():
+                if binary and isinstance(objs, LazyRecords):
+                    records = list(objs.raw_items())
+                elif binary:
+                    records = [(obj_id, encode(obj._cached_json(True)))
+                               for obj_id, obj in objs.items()]
+                elif shards is not None:
+                    # writers are excluded by the read lock
+                    dirty, shards.dirty = shards.dirty, set()
+                    parts = {}
+                    for shard in dirty:
+                        parts[shard] = {obj_id: objs[obj_id]._cached_json(True)
+                                        for obj_id in shards.ids[shard]}
+                else:
+                    objs_json = {}
+                    for obj_id, obj in objs.items():
+                        objs_json[obj_id] = obj._cached_json(True)
+                if binary:
+                    index = self.index(cls).dump()
+                journal.rotate()
+
+            if binary:
+                write_snapshot(".db_{}.bin".format(cls.__name__),
+                               records, index)
+            elif shards is not None:
+                try:
+                    for shard, part in parts.items():
+                        with atomic_write(shards.file_path(shard)) as f:
+                            json.dump(part, f)
+                except BaseException:
+                    with self.lock(cls).write():
+                        shards.dirty |= dirty
+                    raise
+            else:
+                with atomic_write(".db_{}.json".format(cls.__name__)) as f:
+                    json.dump(objs_json, f)
+            for file_path in STALE.pop(cls.__name__, []):
+                if path.exists(file_path):
+                    os.remove(file_path)
+            journal.discard_rotated()
+            if cls._shared:
+                self.mark_synced(cls)
+
+    def compact(self, cls: type):
+        """ Fold the mutation log of `cls` into its snapshot
+        """
+        journal = self.journal(cls)
+        try:
+            self.save_all(cls)
+        finally:
+            journal.compacting = False
+
+    def log(self, cls: type, mutations: List[tuple]):
+        """ Append `(op, id, obj)` mutations to the log, compact it when it
+        grows too big
+        """
+        journal = self.journal(cls)
+        size = journal.extend(mutations)
+        if size < JOURNAL_MAX_BYTES or journal.compacting:
+            return
+        journal.compacting = True
+        threading.Thread(target=self.compact, args=(cls,),
+                         daemon=True).start()
+
+    def persist(self, op: str, cls: type, objs: List[TypeVar('Base')]):
+        """ Make a mutation of `objs` durable according to the storage mode
+        """
+        if not objs:
+            return
+        if cls._journaled or cls._shared:
+            self.log(cls, [(op, obj.id,
+                            obj._cached_json(True) if op == 'save'
+                            else None)
+                           for obj in objs])
+            if cls._shared:
+                self.mark_synced(cls)
+        elif cls._write_behind:
+            FLUSHER.mark(cls, len(objs))
+        else:
+            cls.save_to_file()
+
+    def save(self, obj: TypeVar('Base')):
+        """ Save current object
+        """
+        self.save_many(obj.__class__, [obj])
+
+    def remove(self, obj: TypeVar('Base')):
+        """ Remove object
+        """
+        self.remove_many(obj.__class__, [obj])
+
+    def save_many(self, cls: type, objs: List[TypeVar('Base')]):
+        """ Save objects, persisting them together
+        """
+        with self.process_lock(cls, True):
+            self.refresh(cls, locked=True)
+            with self.lock(cls).write():
+                stored = self.objects(cls)
+                index = self.index(cls)
+                shards = self.shard_map(cls)
+                for obj in objs:
+                    stored[obj.id] = obj
+                    index.add(obj)
+                    self.order_add(cls, obj.id)
+                    if shards is not None:
+                        shards.add(obj.id)
+            self.persist('save', cls, objs)
+
+    def remove_many(self, cls: type, objs: List[TypeVar('Base')]):
+        """ Remove objects, persisting the removals together
+        """
+        with self.process_lock(cls, True):
+            self.refresh(cls, locked=True)
+            removed = []
+            with self.lock(cls).write():
+                stored = self.objects(cls)
+                index = self.index(cls)
+                shards = self.shard_map(cls)
+                for obj in objs:
+                    if obj.id not in stored:
+                        continue
+                    del stored[obj.id]
+                    index.discard(obj.id)
+                    self.order_discard(cls, obj.id)
+                    if shards is not None:
+                        shards.discard(obj.id)
+                    removed.append(obj)
+            self.persist('remove', cls, removed)
+
+    def flush(self, cls: Optional[type] = None):
+        """ Write pending write-behind mutations to file
+        """
+        FLUSHER.flush(cls)
+
+    def count(self, cls: type) -> int:
+        """ Count all objects
+        """
+        self.refresh(cls)
+        with self.lock(cls).read():
+            return len(self.objects(cls))
+
+    def get(self, cls: type, id: str) -> Optional[TypeVar('Base')]:
+        """ Return one object by ID
+        """
+        self.refresh(cls)
+        with self.lock(cls).read():
+            return self.objects(cls).get(id)
+
+    def candidates(self, cls: type, attributes: dict) -> Optional[set]:
+        """ Return the smallest set of ids the index gives for `attributes`,
+        or None if none of them is indexed; read lock held
+        """
+        index = self.index(cls)
+        candidates = None
+        for k, v in attributes.items():
+            ids = index.lookup(k, v)
+            if ids is not None and (candidates is None or
+                                    len(ids) < len(candidates)):
+                candidates = ids
+        return candidates
+
+    def search(self, cls: type,
+               attributes: dict = {}) -> List[TypeVar('Base')]:
+        """ Search all objects with matching attributes
+        """
+        def _search(obj):
+            if len(attributes) == 0:
+                return True
+            for k, v in attributes.items():
+                if (getattr(obj, k) != v):
+                    return False
+            return True
+
+        self.refresh(cls)
+        with self.lock(cls).read():
+            objs = self.objects(cls)
+            candidates = self.candidates(cls, attributes)
+            if candidates is None:
+                return list(filter(_search, objs.values()))
+            return list(filter(_search, (objs[obj_id] for obj_id in candidates
+                                         if obj_id in objs)))
+
+    def iter(self, cls: type,
+             attributes: dict = {}) -> Iterator[TypeVar('Base')]:
+        """ Yield the objects with matching attributes
+
+        Only the candidate ids are copied up front; objects are looked up
+        one by one, without holding the lock between two of them.
+        """
+        self.refresh(cls)
+        with self.lock(cls).read():
+            objs = self.objects(cls)
+            candidates = self.candidates(cls, attributes)
+            ids = list(objs if candidates is None else candidates)
+        for obj_id in ids:
+            with self.lock(cls).read():
+                obj = self.objects(cls).get(obj_id)
+            if obj is None:
+                continue
+            if all(getattr(obj, k) == v for k, v in attributes.items()):
+                yield obj
+
+    def query(self, cls: type, query: Query) -> List[TypeVar('Base')]:
+        """ Run `query`
+
+        Equality and `in` conditions on indexed attributes are answered by
+        the index, intersecting the smallest hit sets first; the objects
+        left (or all of them if no index applies) are then filtered.
+        """
+        self.refresh(cls)
+        with self.lock(cls).read():
+            objs = self.objects(cls)
+            index = self.index(cls)
+            hits = []
+            for attr, values in query.equalities():
+                ids = set()
+                for value in values:
+                    found = index.lookup(attr, value)
+                    if found is None:
+                        ids = None
+                        break
+                    ids.update(found)
+                if ids is not None:
+                    hits.append(ids)
+            if hits:
+                hits.sort(key=len)
+                candidates = (objs[obj_id] for obj_id
+                              in hits[0].intersection(*hits[1:])
+                              if obj_id in objs)
+            else:
+                candidates = objs.values()
+            matching = filter(query.matches, candidates)
+            if not query.order_by:
+                return list(islice(matching, query.limit))
+            return query.sort(matching)
+
+    def page(self, cls: type, after: Optional[str],
+             limit: int) -> List[TypeVar('Base')]:
+        """ Return at most `limit` objects ordered by ID, after `after`
+
+        The cursor is found by binary search in the sorted ids.
+        """
+        self.refresh(cls)
+        with self.lock(cls).read():
+            objs = self.objects(cls)
+            ids = self.sorted_ids(cls)
+            start = 0 if after is None else bisect_right(ids, after)
+            return [objs[obj_id] for obj_id in ids[start:start + limit]]
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+""" Storage module
+"""
+from typing import Iterator, List, Optional, TypeVar
+from models.query import Query
+
+
+class Storage():
+    """ Interface of the storage engines behind `Base`
+
+    Every method receives the model class it operates on, so one engine
+    serves all the models.
+    """
+
+    def load(self, cls: type):
+        """ Load (or reload) the objects of `cls` from persistent storage
+        """
+        raise NotImplementedError
+
+    def save_all(self, cls: type):
+        """ Write every object of `cls` to persistent storage
+        """
+        raise NotImplementedError
+
+    def save(self, obj: TypeVar('Base')):
+        """ Insert or update `obj`
+        """
+        raise NotImplementedError
+
+    def remove(self, obj: TypeVar('Base')):
+        """ Delete `obj` if it is stored
+        """
+        raise NotImplementedError
+
+    def save_many(self, cls: type, objs: List[TypeVar('Base')]):
+        """ Insert or update the objects `objs` of `cls` in one pass
+        """
+        raise NotImplementedError
+
+    def remove_many(self, cls: type, objs: List[TypeVar('Base')]):
+        """ Delete the stored objects among `objs` of `cls` in one pass
+        """
+        raise NotImplementedError
+
+    def flush(self, cls: Optional[type] = None):
+        """ Make pending mutations (of `cls` only if given) durable
+        """
+        raise NotImplementedError
+
+    def count(self, cls: type) -> int:
+        """ Count the objects of `cls`
+        """
+        raise NotImplementedError
+
+    def get(self, cls: type, id: str) -> Optional[TypeVar('Base')]:
+        """ Return the object of `cls` with this ID, or None
+        """
+        raise NotImplementedError
+
+    def search(self, cls: type,
+               attributes: dict = {}) -> List[TypeVar('Base')]:
+        """ Return the objects of `cls` whose attributes equal `attributes`
+        """
+        raise NotImplementedError
+
+    def iter(self, cls: type,
+             attributes: dict = {}) -> Iterator[TypeVar('Base')]:
+        """ Yield the objects `search()` would return, one at a time
+        """
+        raise NotImplementedError
+
+    def query(self, cls: type, query: Query) -> List[TypeVar('Base')]:
+        """ Return the objects of `cls` selected by `query`
+        """
+        raise NotImplementedError
+
+    def page(self, cls: type, after: Optional[str],
+             limit: int) -> List[TypeVar('Base')]:
+        """ Return at most `limit` objects of `cls` ordered by ID, starting
+        after the ID `after` (from the first one if None)
+        """
+        raise NotImplementedError
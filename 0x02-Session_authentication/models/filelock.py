@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+""" Advisory file lock module
+"""
+from contextlib import contextmanager
+import fcntl
+import os
+
+
+class FileLock():
+    """ `flock(2)` lock on a file shared by several processes
+
+    Each acquisition opens its own file description, so threads of one
+    process exclude each other as well. Not reentrant.
+    """
+
+    def __init__(self, file_path: str):
+        """ Initialize a FileLock on `file_path` (created if missing)
+        """
+        self.file_path = file_path
+
+    @contextmanager
+    def hold(self, operation: int):
+        """ Hold the lock with `fcntl.LOCK_SH` or `fcntl.LOCK_EX`
+        """
+        fd = os.open(self.file_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, operation)
+            yield
+        finally:
+            os.close(fd)
+
+    def shared(self):
+        """ Hold the lock as a reader
+        """
+        return self.hold(fcntl.LOCK_SH)
+
+    def exclusive(self):
+        """ Hold the lock as the only writer
+        """
+        return self.hold(fcntl.LOCK_EX)
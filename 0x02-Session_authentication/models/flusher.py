@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+""" Flusher module
+"""
+from typing import Optional
+import atexit
+import threading
+
+
+class Flusher():
+    """ Write-behind of the model files
+
+    Classes are marked dirty on each mutation; a background thread rewrites
+    their file at most every `interval` seconds, or as soon as one of them
+    has `max_pending` unflushed mutations. Pending writes are also flushed
+    at interpreter exit.
+    """
+
+    def __init__(self, interval: float, max_pending: int):
+        """ Initialize a Flusher
+        """
+        self.interval = interval
+        self.max_pending = max_pending
+        self.pending = {}
+        self.cond = threading.Condition()
+        self.flushing = threading.Lock()
+        self.thread = None
+
+    def mark(self, klass: type, mutations: int = 1):
+        """ Record unflushed mutations of `klass`
+        """
+        with self.cond:
+            count = self.pending.get(klass, 0) + mutations
+            self.pending[klass] = count
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, daemon=True)
+                self.thread.start()
+                atexit.register(self.flush)
+            if count >= self.max_pending:
+                self.cond.notify()
+
+    def flush(self, klass: Optional[type] = None):
+        """ Write the dirty classes (only `klass` if given) to their files
+
+        Returns once every mutation marked before the call is on disk.
+        """
+        with self.flushing:
+            with self.cond:
+                if klass is None:
+                    classes = list(self.pending)
+                    self.pending.clear()
+                elif self.pending.pop(klass, None) is not None:
+                    classes = [klass]
+                else:
+                    classes = []
+            error = None
+            for dirty in classes:
+                try:
+                    dirty.save_to_file()
+                except Exception as e:
+                    with self.cond:
+                        self.pending[dirty] = self.pending.get(dirty, 0) + 1
+                    error = error or e
+            if error is not None:
+                raise error
+
+    def _run(self):
+        """ Background loop
+        """
+        while True:
+            with self.cond:
+                self.cond.wait(self.interval)
+            try:
+                self.flush()
+            except Exception:
+                # kept pending, retried on the next round
+                pass
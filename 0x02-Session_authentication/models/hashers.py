@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+""" Password hashers module
+
+Hashes are stored as `<algorithm>$<parameters>$<salt>$<hash>`, except the
+legacy unsalted SHA-256 ones, kept as 64 hex digits. New passwords use the
+hasher named by `PASSWORD_HASHER` (`sha256`, `pbkdf2_sha256` or `scrypt`),
+and `needs_rehash()` tells which stored hashes are not up to date.
+
+Slow hashers run on `POOL`, a bounded pool of `PASSWORD_WORKERS` threads
+(the stdlib KDFs release the GIL); at most `PASSWORD_QUEUE_SIZE` calls wait
+for a worker, later ones block until there is room.
+"""
+from concurrent.futures import Future, ThreadPoolExecutor
+from os import getenv
+from typing import Callable, Dict, Iterable, List
+import base64
+import hashlib
+import hmac
+import os
+import threading
+import time
+
+
+class Hasher():
+    """ Interface of the password hashers
+
+    `slow` hashers are run on the pool rather than on the calling thread.
+    """
+    algorithm = None
+    slow = True
+
+    def encode(self, password: str) -> str:
+        """ Hash `password` with a new salt
+        """
+        raise NotImplementedError
+
+    def verify(self, password: str, encoded: str) -> bool:
+        """ Check `password` against a hash of this algorithm
+        """
+        raise NotImplementedError
+
+    def needs_rehash(self, encoded: str) -> bool:
+        """ Check whether a hash of this algorithm uses outdated parameters
+        """
+        return False
+
+    @staticmethod
+    def salt() -> str:
+        """ Return a new random salt
+        """
+        return base64.b64encode(os.urandom(16)).decode('ascii')
+
+
+class SHA256Hasher(Hasher):
+    """ Legacy unsalted SHA-256, as 64 lowercase hex digits
+    """
+    algorithm = 'sha256'
+    slow = False
+
+    def encode(self, password: str) -> str:
+        """ Hash `password`
+        """
+        return hashlib.sha256(password.encode()).hexdigest().lower()
+
+    def verify(self, password: str, encoded: str) -> bool:
+        """ Check `password`
+        """
+        return hmac.compare_digest(self.encode(password), encoded)
+
+
+class PBKDF2Hasher(Hasher):
+    """ PBKDF2-HMAC-SHA256, `PBKDF2_ITERATIONS` iterations
+    """
+    algorithm = 'pbkdf2_sha256'
+    iterations = int(getenv('PBKDF2_ITERATIONS', 600000))
+
+    def encode(self, password: str, salt: str = None,
+               iterations: int = None) -> str:
+        """ Hash `password`
+        """
+        salt = salt or self.salt()
+        iterations = iterations or self.iterations
+        digest = hashlib.pbkdf2_hmac('sha256', password.encode(),
+                                     salt.encode(), iterations)
+        return "{}${}${}${}".format(self.algorithm, iterations, salt,
+                                    base64.b64encode(digest).decode('ascii'))
+
+    def verify(self, password: str, encoded: str) -> bool:
+        """ Check `password`
+        """
+        _, iterations, salt, _ = encoded.split('$', 3)
+        return hmac.compare_digest(
+            self.encode(password, salt, int(iterations)), encoded)
+
+    def needs_rehash(self, encoded: str) -> bool:
+        """ Check the number of iterations
+        """
+        return int(encoded.split('$', 2)[1]) != self.iterations
+
+
+class ScryptHasher(Hasher):
+    """ scrypt, cost `SCRYPT_N` (block size 8, parallelism 1)
+    """
+    algorithm = 'scrypt'
+    n = int(getenv('SCRYPT_N', 2 ** 14))
+    r = 8
+    p = 1
+
+    def encode(self, password: str, salt: str = None, n: int = None,
+               r: int = None, p: int = None) -> str:
+        """ Hash `password`
+        """
+        salt = salt or self.salt()
+        n, r, p = n or self.n, r or self.r, p or self.p
+        digest = hashlib.scrypt(password.encode(), salt=salt.encode(),
+                                n=n, r=r, p=p, maxmem=256 * n * r,
+                                dklen=32)
+        return "{}${}:{}:{}${}${}".format(
+            self.algorithm, n, r, p, salt,
+            base64.b64encode(digest).decode('ascii'))
+
+    def verify(self, password: str, encoded: str) -> bool:
+        """ Check `password`
+        """
+        _, parameters, salt, _ = encoded.split('$', 3)
+        n, r, p = (int(value) for value in parameters.split(':'))
+        return hmac.compare_digest(self.encode(password, salt, n, r, p),
+                                   encoded)
+
+    def needs_rehash(self, encoded: str) -> bool:
+        """ Check the cost parameters
+        """
+        return encoded.split('$', 2)[1] != "{}:{}:{}".format(
+            self.n, self.r, self.p)
+
+
+HASHERS = {hasher.algorithm: hasher for hasher in (
+    SHA256Hasher(), PBKDF2Hasher(), ScryptHasher())}
+DEFAULT = HASHERS[getenv('PASSWORD_HASHER', 'sha256')]
+
+
+class HashingPool():
+    """ Bounded pool running the hashing calls, with queue metrics
+    """
+
+    def __init__(self, workers: int, queue_size: int):
+        """ Initialize a pool of `workers` threads, `queue_size` waiting
+        calls at most
+        """
+        self.executor = ThreadPoolExecutor(max_workers=workers,
+                                           thread_name_prefix='hashing')
+        self.workers = workers
+        self.slots = threading.BoundedSemaphore(workers + queue_size)
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.max_pending = 0
+        self.completed = 0
+        self.wait_time = 0.0
+
+    def submit(self, function: Callable, *args) -> Future:
+        """ Queue `function(*args)` for a worker, blocking while the queue
+        is full, and return its future
+        """
+        start = time.perf_counter()
+        self.slots.acquire()
+        with self.lock:
+            self.pending += 1
+            self.max_pending = max(self.max_pending, self.pending)
+
+        def done(future: Future):
+            with self.lock:
+                self.pending -= 1
+                self.completed += 1
+                self.wait_time += time.perf_counter() - start
+            self.slots.release()
+
+        try:
+            future = self.executor.submit(function, *args)
+        except BaseException:
+            done(None)
+            raise
+        future.add_done_callback(done)
+        return future
+
+    def run(self, function: Callable, *args):
+        """ Run `function(*args)` on a worker, wait for and return its
+        result
+        """
+        return self.submit(function, *args).result()
+
+    def map(self, function: Callable, items: Iterable) -> list:
+        """ Run `function(item)` for each item on the workers at once,
+        return the results in order
+        """
+        futures = [self.submit(function, item) for item in items]
+        return [future.result() for future in futures]
+
+    def metrics(self) -> Dict[str, float]:
+        """ Return the queue depth and throughput counters
+        """
+        with self.lock:
+            average = self.wait_time / self.completed if self.completed \
+                else 0.0
+            return {
+                'workers': self.workers,
+                'queued': max(self.pending - self.workers, 0),
+                'in_flight': min(self.pending, self.workers),
+                'max_pending': self.max_pending,
+                'completed': self.completed,
+                'average_ms': average * 1000,
+            }
+
+
+POOL = HashingPool(int(getenv('PASSWORD_WORKERS', os.cpu_count() or 1)),
+                   int(getenv('PASSWORD_QUEUE_SIZE', 64)))
+
+
+def identify(encoded: str) -> Hasher:
+    """ Return the hasher of a stored hash
+    """
+    algorithm, separator, _ = encoded.partition('$')
+    if not separator:
+        return HASHERS['sha256']
+    hasher = HASHERS.get(algorithm)
+    if hasher is None:
+        raise ValueError("unknown password hasher '{}'".format(algorithm))
+    return hasher
+
+
+def encode(password: str) -> str:
+    """ Hash `password` with the default hasher
+    """
+    if not DEFAULT.slow:
+        return DEFAULT.encode(password)
+    return POOL.run(DEFAULT.encode, password)
+
+
+def encode_many(passwords: List[str]) -> List[str]:
+    """ Hash `passwords` with the default hasher, concurrently if it is
+    slow
+    """
+    if not DEFAULT.slow:
+        return [DEFAULT.encode(password) for password in passwords]
+    return POOL.map(DEFAULT.encode, passwords)
+
+
+def verify(password: str, encoded: str) -> bool:
+    """ Check `password` against a stored hash, False if it is malformed
+    """
+    try:
+        hasher = identify(encoded)
+        if not hasher.slow:
+            return hasher.verify(password, encoded)
+        return POOL.run(hasher.verify, password, encoded)
+    except ValueError:
+        return False
+
+
+def needs_rehash(encoded: str) -> bool:
+    """ Check whether a stored hash should be replaced by a hash of the
+    default hasher (never when that is the legacy SHA-256)
+    """
+    if DEFAULT is HASHERS['sha256']:
+        return False
+    hasher = identify(encoded)
+    return hasher is not DEFAULT or hasher.needs_rehash(encoded)
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+""" Index module
+"""
+from typing import Callable, Iterable, Optional, Set, TypeVar
+import threading
+
+
+class HashIndex():
+    """ Equality index over some attributes of the objects of one class
+
+    Maps `attribute -> value -> set of ids`, and remembers the values each
+    id was indexed under so it can be moved when the object is saved again.
+
+    An index can be attached to a serialized form of itself (see `dump()`),
+    which is only decoded the first time the index is used.
+    """
+
+    def __init__(self, attributes: Iterable[str]):
+        """ Initialize an empty index on `attributes`
+        """
+        self.attributes = tuple(attributes)
+        self.source_lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        """ Drop every entry
+        """
+        self.ids_by_value = {attr: {} for attr in self.attributes}
+        self.values_by_id = {}
+        self.source = None
+
+    def attach(self, source: Callable[[], dict]):
+        """ Replace the entries by the output of `dump()` that `source`
+        returns when the index is first used
+        """
+        self.clear()
+        self.source = source
+
+    def dump(self) -> dict:
+        """ Return the entries as `{attribute: [[value, [ids]], ...]}`
+        """
+        self.materialize()
+        return {attr: [[value, sorted(ids)]
+                       for value, ids in self.ids_by_value[attr].items()]
+                for attr in self.attributes}
+
+    def materialize(self):
+        """ Decode the attached entries, if any
+        """
+        if self.source is None:
+            return
+        with self.source_lock:
+            if self.source is not None:
+                self.load(self.source())
+                self.source = None
+
+    def load(self, entries: dict):
+        """ Fill the index from the output of `dump()`
+        """
+        values = {}
+        for position, attr in enumerate(self.attributes):
+            for value, ids in entries.get(attr, []):
+                try:
+                    self.ids_by_value[attr][value] = set(ids)
+                except TypeError:
+                    continue
+                for obj_id in ids:
+                    if obj_id not in values:
+                        values[obj_id] = [None] * len(self.attributes)
+                    values[obj_id][position] = value
+        self.values_by_id = {obj_id: tuple(v) for obj_id, v in values.items()}
+
+    def add(self, obj: TypeVar('Base')):
+        """ Index `obj` under its current attribute values
+        """
+        self.materialize()
+        self.discard(obj.id)
+        values = []
+        for attr in self.attributes:
+            value = getattr(obj, attr, None)
+            try:
+                self.ids_by_value[attr].setdefault(value, set()).add(obj.id)
+            except TypeError:
+                # unhashable value: left out, lookups fall back to a scan
+                value = None
+            values.append(value)
+        self.values_by_id[obj.id] = tuple(values)
+
+    def discard(self, obj_id: str):
+        """ Remove `obj_id` from the index
+        """
+        self.materialize()
+        values = self.values_by_id.pop(obj_id, None)
+        if values is None:
+            return
+        for attr, value in zip(self.attributes, values):
+            ids = self.ids_by_value[attr].get(value)
+            if ids is None:
+                continue
+            ids.discard(obj_id)
+            if not ids:
+                del self.ids_by_value[attr][value]
+
+    def lookup(self, attr: str, value) -> Optional[Set[str]]:
+        """ Return the ids indexed under `attr == value`
+
+        Return None when `attr` is not indexed or `value` is unhashable,
+        i.e. when the caller has to scan instead.
+        """
+        self.materialize()
+        ids_by_value = self.ids_by_value.get(attr)
+        if ids_by_value is None:
+            return None
+        try:
+            return ids_by_value.get(value, set())
+        except TypeError:
+            return None
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+""" Journal module
+"""
+from typing import Iterable, Iterator, Optional, Tuple
+from os import path
+import json
+import os
+import threading
+
+
+class Journal():
+    """ Append-only log of the mutations of one model class
+
+    Each line is a JSON record `{"op": "save"|"remove", "id", "obj"}`.
+    Records are full-object upserts or deletions, so replaying them more than
+    once over a snapshot is harmless.
+    """
+
+    def __init__(self, file_path: str):
+        """ Initialize a Journal on `file_path`
+        """
+        self.file_path = file_path
+        self.rotated_path = "{}.old".format(file_path)
+        self.lock = threading.Lock()
+        self.compacting = False
+        self.size = path.getsize(file_path) if path.exists(file_path) else 0
+
+    def append(self, op: str, obj_id: str, obj_json: dict = None) -> int:
+        """ Append one mutation record, return the new size of the log
+        """
+        return self.extend([(op, obj_id, obj_json)])
+
+    def extend(self, mutations: Iterable[Tuple[str, str, Optional[dict]]]
+               ) -> int:
+        """ Append `(op, id, obj)` records in one write, return the new size
+        of the log
+        """
+        lines = []
+        for op, obj_id, obj_json in mutations:
+            record = {'op': op, 'id': obj_id}
+            if obj_json is not None:
+                record['obj'] = obj_json
+            lines.append(json.dumps(record, separators=(',', ':')) + '\n')
+        with self.lock:
+            with open(self.file_path, 'a') as f:
+                f.write(''.join(lines))
+                self.size = f.tell()
+            return self.size
+
+    def records(self) -> Iterator[Tuple[str, str, Optional[dict]]]:
+        """ Yield `(op, id, obj)` for the rotated log then the current log
+        """
+        for file_path in (self.rotated_path, self.file_path):
+            if not path.exists(file_path):
+                continue
+            with open(file_path, 'r') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # torn write at the end of the log
+                        continue
+                    yield record.get('op'), record.get('id'), \
+                        record.get('obj')
+
+    def tail(self, offset: int) -> Tuple[list, int]:
+        """ Return the `(op, id, obj)` records of the current log written
+        after `offset`, and the offset following the last complete one
+        """
+        if not path.exists(self.file_path):
+            return [], offset
+        with open(self.file_path, 'rb') as f:
+            f.seek(offset)
+            data = f.read()
+        end = data.rfind(b'\n') + 1
+        records = []
+        for line in data[:end].splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            records.append((record.get('op'), record.get('id'),
+                            record.get('obj')))
+        return records, offset + end
+
+    def rotate(self):
+        """ Move the current log aside before a snapshot is written
+
+        Must be called with `lock` held. A rotated log left behind by an
+        interrupted compaction is kept and extended, never overwritten.
+        """
+        if not path.exists(self.file_path):
+            return
+        if path.exists(self.rotated_path):
+            with open(self.file_path, 'r') as src, \
+                    open(self.rotated_path, 'a') as dst:
+                dst.write(src.read())
+            os.remove(self.file_path)
+        else:
+            os.replace(self.file_path, self.rotated_path)
+        self.size = 0
+
+    def discard_rotated(self):
+        """ Drop the rotated log once the snapshot covering it is on disk
+        """
+        if path.exists(self.rotated_path):
+            os.remove(self.rotated_path)
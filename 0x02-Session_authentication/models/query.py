@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+""" Query module
+"""
+from typing import Iterable, List, Optional, Tuple, TypeVar, Union
+from models.timestamp import parse
+import heapq
+import operator
+
+
+OPERATORS = {
+    'eq': operator.eq,
+    'ne': operator.ne,
+    'gt': operator.gt,
+    'gte': operator.ge,
+    'lt': operator.lt,
+    'lte': operator.le,
+    'in': lambda value, values: value in values,
+    'startswith': lambda value, prefix: isinstance(value, str) and
+    value.startswith(prefix),
+}
+
+
+class Query():
+    """ Filters, ordering and limit of a `Base.query()`
+
+    Filters map `attribute` or `attribute__operator` to a value, with the
+    operators of `OPERATORS` (`eq` when omitted); `in` takes a list of
+    values. All filters must hold. `order_by` is an attribute name, or a
+    list of them, each prefixed by `-` for descending order.
+
+    Values compared to a timestamp attribute may be given as ISO strings
+    (`2017-10-16` or `2017-10-16T04:23:04`).
+    """
+
+    def __init__(self, cls: type, filters: dict = {},
+                 order_by: Union[str, List[str], None] = None,
+                 limit: Optional[int] = None):
+        """ Initialize a Query on the objects of `cls`
+        """
+        fields = cls._fields()
+        self.conditions = []
+        for key, value in filters.items():
+            attr, _, op = key.partition('__')
+            op = op or 'eq'
+            if attr not in fields:
+                raise AttributeError("'{}' object has no attribute '{}'"
+                                     .format(cls.__name__, attr))
+            if op not in OPERATORS:
+                raise ValueError("unknown operator '{}'".format(op))
+            if op == 'in':
+                value = [self.coerce(cls, attr, v) for v in value]
+            else:
+                value = self.coerce(cls, attr, value)
+            self.conditions.append((attr, op, value))
+
+        if isinstance(order_by, str):
+            order_by = [order_by]
+        self.order_by = []
+        for key in order_by or []:
+            attr = key.lstrip('-')
+            if attr not in fields:
+                raise AttributeError("'{}' object has no attribute '{}'"
+                                     .format(cls.__name__, attr))
+            self.order_by.append((attr, key.startswith('-')))
+        self.limit = limit
+
+    @staticmethod
+    def coerce(cls: type, attr: str, value):
+        """ Turn ISO strings compared to timestamps into datetimes
+        """
+        if attr in cls._timestamps and isinstance(value, str):
+            return parse(value)
+        return value
+
+    def matches(self, obj: TypeVar('Base')) -> bool:
+        """ Check all conditions against `obj`
+        """
+        for attr, op, value in self.conditions:
+            try:
+                if not OPERATORS[op](getattr(obj, attr), value):
+                    return False
+            except TypeError:
+                # e.g. None compared to a string
+                return False
+        return True
+
+    def equalities(self) -> Iterable[Tuple[str, list]]:
+        """ Yield `(attribute, accepted values)` for the conditions an
+        equality index can answer
+        """
+        for attr, op, value in self.conditions:
+            if op == 'eq':
+                yield attr, [value]
+            elif op == 'in':
+                yield attr, value
+
+    def sort(self, objs: Iterable[TypeVar('Base')]) -> List[TypeVar('Base')]:
+        """ Order and limit matching objects; None sorts first
+        """
+        def key(attr):
+            return lambda obj: (getattr(obj, attr) is not None,
+                                getattr(obj, attr))
+
+        if self.limit is not None and len(self.order_by) == 1:
+            attr, descending = self.order_by[0]
+            select = heapq.nlargest if descending else heapq.nsmallest
+            return select(self.limit, objs, key=key(attr))
+        objs = list(objs)
+        for attr, descending in reversed(self.order_by):
+            objs.sort(key=key(attr), reverse=descending)
+        return objs if self.limit is None else objs[:self.limit]
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+""" Reader/writer lock module
+"""
+from contextlib import contextmanager
+import threading
+
+
+class RWLock():
+    """ Lock shared by any number of readers or held by one writer
+
+    Waiting writers block new readers, so a steady flow of reads cannot
+    starve writes. Not reentrant.
+    """
+
+    def __init__(self):
+        """ Initialize an unlocked RWLock
+        """
+        self.cond = threading.Condition(threading.Lock())
+        self.readers = 0
+        self.writer = False
+        self.waiting_writers = 0
+
+    @contextmanager
+    def read(self):
+        """ Hold the lock as a reader
+        """
+        with self.cond:
+            while self.writer or self.waiting_writers:
+                self.cond.wait()
+            self.readers += 1
+        try:
+            yield
+        finally:
+            with self.cond:
+                self.readers -= 1
+                if self.readers == 0:
+                    self.cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        """ Hold the lock as the only writer
+        """
+        with self.cond:
+            self.waiting_writers += 1
+            while self.writer or self.readers:
+                self.cond.wait()
+            self.waiting_writers -= 1
+            self.writer = True
+        try:
+            yield
+        finally:
+            with self.cond:
+                self.writer = False
+                self.cond.notify_all()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+""" Shards module
+"""
+from typing import Iterable, List, Optional
+from zlib import crc32
+import glob
+import json
+import re
+
+
+def shard_paths(s_class: str) -> List[str]:
+    """ Return the existing `.db_<Class>.<k>.json` files of a class
+    """
+    pattern = re.compile(r'\.db_{}\.\d+\.json\Z'.format(re.escape(s_class)))
+    return sorted(file_path
+                  for file_path in glob.glob(".db_{}.*.json".format(s_class))
+                  if pattern.match(file_path))
+
+
+def read_json(file_path: str) -> dict:
+    """ Load one JSON file
+    """
+    with open(file_path, 'r') as f:
+        return json.load(f)
+
+
+class ShardMap():
+    """ Partition of the ids of one class into `count` snapshot files
+
+    An id belongs to shard `crc32(id) % count`, which is the same in every
+    process. Shards holding ids added or removed since they were written
+    are `dirty`.
+    """
+
+    def __init__(self, s_class: str, count: int):
+        """ Initialize an empty ShardMap of `count` shards
+        """
+        self.s_class = s_class
+        self.count = count
+        self.clear()
+
+    def clear(self):
+        """ Drop every id
+        """
+        self.ids = [set() for _ in range(self.count)]
+        self.dirty = set()
+
+    def file_path(self, shard: int) -> str:
+        """ Return the snapshot file of `shard`
+        """
+        return ".db_{}.{}.json".format(self.s_class, shard)
+
+    def file_paths(self) -> List[str]:
+        """ Return the snapshot files of all the shards
+        """
+        return [self.file_path(shard) for shard in range(self.count)]
+
+    def shard(self, obj_id: str) -> int:
+        """ Return the shard of `obj_id`
+        """
+        return crc32(obj_id.encode('utf-8')) % self.count
+
+    def add(self, obj_id: str):
+        """ Place a saved id, marking its shard dirty
+        """
+        shard = self.shard(obj_id)
+        self.ids[shard].add(obj_id)
+        self.dirty.add(shard)
+
+    def discard(self, obj_id: str):
+        """ Remove an id, marking its shard dirty
+        """
+        shard = self.shard(obj_id)
+        self.ids[shard].discard(obj_id)
+        self.dirty.add(shard)
+
+    def place(self, obj_ids: Iterable[str], shard: Optional[int]):
+        """ Place ids loaded from the file of `shard` (None for a file of
+        another layout), marking dirty the shards they are missing from
+        """
+        for obj_id in obj_ids:
+            obj_shard = self.shard(obj_id)
+            self.ids[obj_shard].add(obj_id)
+            if obj_shard != shard:
+                self.dirty.add(obj_shard)
+
+    def mark_all(self):
+        """ Mark every shard dirty
+        """
+        self.dirty = set(range(self.count))
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+""" Binary snapshot module
+
+Layout of a `.db_<Class>.bin` file (little endian):
+
+- header: magic `BDB1`, record count, key width, index section length;
+- directory: one `(id padded to key width, offset, length)` entry per
+  record, sorted by id, so an id is found by binary search in place;
+- index section: `HashIndex.dump()` of the class, as JSON;
+- records: the `to_json(True)` of every object, as compact JSON.
+
+The file is memory-mapped and a record is only decoded when its object is
+first accessed, so loading costs the same whatever the number of records.
+`models/convert.py` converts the JSON files from and to this format.
+"""
+from collections.abc import MutableMapping
+from typing import Iterable, Iterator, Optional, Tuple, TypeVar
+from models.atomic import atomic_write
+import json
+import mmap
+import struct
+
+
+MAGIC = b'BDB1'
+HEADER = struct.Struct('<4sIII')
+
+
+def encode(obj_json: dict) -> bytes:
+    """ Serialize one record
+    """
+    return json.dumps(obj_json, separators=(',', ':')).encode('utf-8')
+
+
+def write_snapshot(file_path: str, records: Iterable[Tuple[str, bytes]],
+                   index: dict):
+    """ Write `(id, encoded record)` pairs and an index dump to `file_path`
+    """
+    records = sorted((obj_id.encode('utf-8'), raw) for obj_id, raw in records)
+    key_width = max([len(key) for key, _ in records] or [1])
+    entry = struct.Struct('<{}sQI'.format(key_width))
+    index_bytes = encode(index)
+    offset = HEADER.size + len(records) * entry.size + len(index_bytes)
+
+    with atomic_write(file_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(records), key_width, len(index_bytes)))
+        for key, raw in records:
+            f.write(entry.pack(key, offset, len(raw)))
+            offset += len(raw)
+        f.write(index_bytes)
+        for _, raw in records:
+            f.write(raw)
+
+
+class Snapshot():
+    """ Read-only, memory-mapped view of a binary snapshot
+    """
+
+    def __init__(self, file_path: str):
+        """ Map `file_path`
+        """
+        with open(file_path, 'rb') as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, self.key_width, index_len = \
+            HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC:
+            raise ValueError("{} is not a binary snapshot".format(file_path))
+        self.entry = struct.Struct('<{}sQI'.format(self.key_width))
+        self.index_start = HEADER.size + self.count * self.entry.size
+        self.index_end = self.index_start + index_len
+
+    def position(self, obj_id: str) -> int:
+        """ Return the directory position of `obj_id`, or -1
+        """
+        key = obj_id.encode('utf-8')
+        if len(key) > self.key_width:
+            return -1
+        key = key.ljust(self.key_width, b'\0')
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            start = HEADER.size + middle * self.entry.size
+            current = self.mm[start:start + self.key_width]
+            if current < key:
+                low = middle + 1
+            elif current > key:
+                high = middle
+            else:
+                return middle
+        return -1
+
+    def find(self, obj_id: str) -> Optional[bytes]:
+        """ Return the encoded record of `obj_id`, or None
+        """
+        position = self.position(obj_id)
+        if position < 0:
+            return None
+        _, offset, length = self.entry.unpack_from(
+            self.mm, HEADER.size + position * self.entry.size)
+        return self.mm[offset:offset + length]
+
+    def ids(self) -> Iterator[str]:
+        """ Yield every id, in order
+        """
+        directory = self.mm[HEADER.size:self.index_start]
+        for key, _, _ in self.entry.iter_unpack(directory):
+            yield key.rstrip(b'\0').decode('utf-8')
+
+    def items(self) -> Iterator[Tuple[str, bytes]]:
+        """ Yield every `(id, encoded record)`, in id order
+        """
+        directory = self.mm[HEADER.size:self.index_start]
+        for key, offset, length in self.entry.iter_unpack(directory):
+            yield key.rstrip(b'\0').decode('utf-8'), \
+                self.mm[offset:offset + length]
+
+    def index(self) -> dict:
+        """ Decode the index section
+        """
+        return json.loads(self.mm[self.index_start:self.index_end])
+
+
+class LazyRecords(MutableMapping):
+    """ `id -> object` mapping over a snapshot, decoding on first access
+
+    Objects saved or removed since the snapshot was mapped are tracked on
+    the side; the snapshot itself is never modified.
+    """
+
+    def __init__(self, snapshot: Snapshot, cls: type):
+        """ Initialize the mapping of the objects of `cls`
+        """
+        self.snapshot = snapshot
+        self.cls = cls
+        self.objs = {}
+        self.added = set()
+        self.deleted = set()
+
+    def __getitem__(self, obj_id: str) -> TypeVar('Base'):
+        """ Return the object, decoding it if needed
+        """
+        obj = self.objs.get(obj_id)
+        if obj is not None:
+            return obj
+        if obj_id in self.deleted:
+            raise KeyError(obj_id)
+        raw = self.snapshot.find(obj_id)
+        if raw is None:
+            raise KeyError(obj_id)
+        obj = self.cls(**json.loads(raw))
+        self.objs[obj_id] = obj
+        return obj
+
+    def __setitem__(self, obj_id: str, obj: TypeVar('Base')):
+        """ Add or replace an object
+        """
+        if obj_id not in self.objs and obj_id not in self.added:
+            if self.snapshot.position(obj_id) < 0:
+                self.added.add(obj_id)
+            else:
+                self.deleted.discard(obj_id)
+        self.objs[obj_id] = obj
+
+    def __delitem__(self, obj_id: str):
+        """ Remove an object
+        """
+        if obj_id not in self:
+            raise KeyError(obj_id)
+        self.objs.pop(obj_id, None)
+        if obj_id in self.added:
+            self.added.discard(obj_id)
+        else:
+            self.deleted.add(obj_id)
+
+    def __contains__(self, obj_id) -> bool:
+        """ Check an id without decoding its record
+        """
+        if obj_id in self.objs:
+            return True
+        if obj_id in self.deleted or not isinstance(obj_id, str):
+            return False
+        return self.snapshot.position(obj_id) >= 0
+
+    def __iter__(self) -> Iterator[str]:
+        """ Iterate over the ids
+        """
+        for obj_id in self.snapshot.ids():
+            if obj_id not in self.deleted:
+                yield obj_id
+        yield from list(self.added)
+
+    def __len__(self) -> int:
+        """ Number of objects
+        """
+        return self.snapshot.count - len(self.deleted) + len(self.added)
+
+    def raw_items(self) -> Iterator[Tuple[str, bytes]]:
+        """ Yield `(id, encoded record)` for every object, copying the
+        records that were never decoded as they are
+        """
+        for obj_id, raw in self.snapshot.items():
+            if obj_id in self.deleted:
+                continue
+            obj = self.objs.get(obj_id)
+            yield obj_id, raw if obj is None \
+                else encode(obj._cached_json(True))
+        for obj_id in list(self.added):
+            yield obj_id, encode(self.objs[obj_id]._cached_json(True))
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+""" Timestamp module
+
+Codec of the `created_at` and `updated_at` attributes. Objects keep the
+value they were loaded with (an ISO string or epoch seconds) and only turn
+it into a `datetime` when the attribute is read, so loading and saving
+untouched objects never parses or formats a date.
+
+With `DB_TIMESTAMP=epoch`, timestamps are stored as integer seconds since
+the epoch instead of `%Y-%m-%dT%H:%M:%S` strings. Both are read back
+whatever the setting.
+"""
+from datetime import datetime, timedelta
+from os import getenv
+from typing import Union
+
+
+EPOCH = datetime(1970, 1, 1)
+SECOND = timedelta(seconds=1)
+ISO_LENGTH = len('2017-10-16T04:23:04')
+STORAGE = getenv('DB_TIMESTAMP', 'iso')
+
+
+def parse(value: Union[str, int, float]) -> datetime:
+    """ Decode an ISO string or epoch seconds (UTC)
+    """
+    if type(value) is str:
+        return datetime.fromisoformat(value)
+    return EPOCH + timedelta(seconds=value)
+
+
+def to_iso(value: Union[datetime, str, int, float]) -> str:
+    """ Return `value` as `%Y-%m-%dT%H:%M:%S`, without decoding it if it
+    already is
+    """
+    if type(value) is str and len(value) == ISO_LENGTH:
+        return value
+    if type(value) is not datetime:
+        value = parse(value)
+    return value.isoformat(timespec='seconds')
+
+
+def to_epoch(value: Union[datetime, str, int, float]) -> int:
+    """ Return `value` as integer seconds since the epoch
+    """
+    if type(value) is int:
+        return value
+    if type(value) is not datetime:
+        value = parse(value)
+    return (value - EPOCH) // SECOND
+
+
+encode = to_epoch if STORAGE == 'epoch' else to_iso
+
+
+class Timestamp():
+    """ Descriptor decoding the value of a slot on first read
+
+    `created_at = Timestamp('_created_at')` exposes the `_created_at` slot
+    as a `datetime`; assigning stores the value as given.
+    """
+
+    def __init__(self, slot: str):
+        """ Initialize a Timestamp over the slot `slot`
+        """
+        self.slot = slot
+        self.member = None
+
+    def __set_name__(self, owner: type, name: str):
+        """ Keep the slot descriptor, to skip the attribute lookup
+        """
+        self.member = owner.__dict__[self.slot]
+
+    def __get__(self, obj, owner: type = None):
+        """ Return the `datetime`, decoding the stored value once
+        """
+        if obj is None:
+            return self
+        value = self.member.__get__(obj, owner)
+        if value is not None and type(value) is not datetime:
+            value = parse(value)
+            self.member.__set__(obj, value)
+        return value
+
+    def __set__(self, obj, value):
+        """ Store `value` as is
+        """
+        self.member.__set__(obj, value)
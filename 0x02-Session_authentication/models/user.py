@@ -1,13 +1,15 @@
 #!/usr/bin/env python3
 """ User module
 """
-import hashlib
+from models import hashers
 from models.base import Base
 
 
 class User(Base):
     """ User class
     """
+    __slots__ = ('email', '_password', 'first_name', 'last_name')
+    _indexes = ('email',)
 
     def __init__(self, *args: list, **kwargs: dict):
         """ Initialize a User instance
@@ -26,22 +28,41 @@ class User(Base):
 
     @password.setter
     def password(self, pwd: str):
-        """ Setter of a new password: encrypt in SHA256
+        """ Setter of a new password: hash with the default hasher
+        (SHA256 unless PASSWORD_HASHER says otherwise)
         """
         if pwd is None or type(pwd) is not str:
             self._password = None
         else:
-            self._password = hashlib.sha256(pwd.encode()).hexdigest().lower()
+            self._password = hashers.encode(pwd)
+
+    @staticmethod
+    def set_passwords(users: list, pwds: list):
+        """ Set the passwords of several users, hashed concurrently by a
+        slow hasher
+        """
+        valid = [(user, pwd) for user, pwd in zip(users, pwds)
+                 if pwd is not None and type(pwd) is str]
+        encoded = hashers.encode_many([pwd for _, pwd in valid])
+        for user in users:
+            user._password = None
+        for (user, _), password in zip(valid, encoded):
+            user._password = password
 
     def is_valid_password(self, pwd: str) -> bool:
-        """ Validate a password
+        """ Validate a password, upgrading its hash to the default hasher
+        once it is known to be valid
         """
         if pwd is None or type(pwd) is not str:
             return False
         if self.password is None:
             return False
-        pwd_e = pwd.encode()
-        return hashlib.sha256(pwd_e).hexdigest().lower() == self.password
+        if not hashers.verify(pwd, self.password):
+            return False
+        if hashers.needs_rehash(self.password):
+            self.password = pwd
+            self.save()
+        return True
 
     def display_name(self) -> str:
         """ Display User name based on email/first_name/last_name
@@ -6,7 +6,14 @@ from models.base import Base
 
 class UserSession(Base):
     """ UserSession class
+
+    Looked up by `session_id` through the index; logins and logouts are
+    written behind (see `FileStorage`), so they never rewrite the file
+    inline.
     """
+    __slots__ = ('user_id', 'session_id')
+    _indexes = ('user_id', 'session_id')
+    _write_behind = True
 
     def __init__(self, *args: list, **kwargs: dict):
         """ Initialize a User instance